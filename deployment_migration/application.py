@@ -294,7 +294,7 @@ class GithubActionsAuthor(abc.ABC):
         application_runtime_target: ApplicationRuntimeTarget,
         terraform_base_folder: Path,
         dockerfile_path: str = None,
-        gradle_file_path: str = None,
+        gradle_folder_path: str = None,
         openapi_spec_path: str = None,
         skip_service_environment: bool = False,
         aws_role_name: Optional[str] = None,
@@ -309,6 +309,7 @@ class GithubActionsAuthor(abc.ABC):
         application_runtime_target: ApplicationRuntimeTarget,
         terraform_base_folder: Path,
         dockerfile_path: str = None,
+        gradle_folder_path: str = None,
         skip_service_environment: bool = False,
         aws_role_name: Optional[str] = None,
     ) -> str:
@@ -1,9 +1,438 @@
+import functools
+import os
 import re
-from typing import Self, Any, Optional
+from dataclasses import dataclass
+from typing import Self, Any, Iterable, Iterator, Optional
 from pathlib import Path
 
 from deployment_migration.application import Terraform, NotFoundError
 
+# Values starting with these prefixes are Terraform references and must not be quoted
+_UNQUOTED_PREFIXES = ("module.", "var.", "local.", "data.", "each.", "count.")
+
+# Templates for generated blocks. The body is a run of complete lines
+_MODULE_TEMPLATE = 'module "{name}" {{\n  source = "{source}"\n{body}}}\n'
+_DATA_SOURCE_TEMPLATE = 'data "{resource}" "{name}" {{\n{body}}}\n'
+_REQUIRED_PROVIDERS_TEMPLATE = "terraform {{\n  required_providers {{\n{body}  }}\n}}\n"
+
+_ECS_MODULE_SOURCE = "github.com/nsbno/terraform-aws-ecs-service"
+
+_REQUIRED_PROVIDERS_RE = re.compile(r"required_providers\s+\{")
+_PROVIDER_ENTRY_RE = re.compile(r"([\w-]+)\s*=\s*\{")
+_VERSION_ATTRIBUTE_RE = re.compile(r'version\s*=\s*"([^"]*)"')
+_BUCKET_RE = re.compile(r'bucket\s*=\s*"(\d+)-[^"]*"')
+_LB_LISTENERS_RE = re.compile(r"lb_listeners\s*=\s*\[")
+_DATADOG_TAGS_RE = re.compile(r"datadog_tags\s*=\s*\{")
+# The whole docker_image line, including leading whitespace
+_DOCKER_IMAGE_LINE_RE = re.compile(r"^[ \t]*docker_image\s*=\s*[^\n]+\n", re.MULTILINE)
+# Matches both quoted strings and unquoted references (local.x, var.x, etc.).
+# Only starting at the beginning of a whitespace run keeps long runs linear.
+_IMAGE_RE = re.compile(r"(?<!\s)\s+image\s*=\s*(?:\"[^\"]*\"|[^\s\n]+)")
+
+
+def _format_string_or_reference(value: str) -> str:
+    # Plain values are wrapped in quotes, references are kept as-is
+    if value.startswith(_UNQUOTED_PREFIXES):
+        return value
+    return f'"{value}"'
+
+
+def _format_bool(value: bool) -> str:
+    return str(value).lower()
+
+
+def _format_dict(value: dict) -> str:
+    raise NotImplementedError(
+        "If you see this, you need to implement dicts in the TF function"
+    )
+
+
+# How variable values are written as HCL, keyed by type. Other values are
+# written with str().
+_VARIABLE_FORMATTERS = {
+    str: _format_string_or_reference,
+    bool: _format_bool,
+    dict: _format_dict,
+}
+
+
+def _format_value(value: Any) -> str:
+    """Format a variable value as HCL using the formatter for its type."""
+    formatter = _VARIABLE_FORMATTERS.get(type(value))
+    if formatter is None:
+        # Fall back to the base classes, so e.g. str enums are still quoted
+        formatter = next(
+            (
+                _VARIABLE_FORMATTERS[base]
+                for base in type(value).__mro__
+                if base in _VARIABLE_FORMATTERS
+            ),
+            str,
+        )
+    return formatter(value)
+
+
+@functools.lru_cache(maxsize=8)
+def _bracket_pattern(open_char: str, close_char: str) -> re.Pattern:
+    return re.compile(f"[{re.escape(open_char)}{re.escape(close_char)}]")
+
+
+def _find_closing_bracket(
+    text: str, open_pos: int, open_char: str = "{", close_char: str = "}"
+) -> int:
+    """Find the position of the bracket closing the one at open_pos.
+
+    The regex engine skips over everything that is not a bracket, so only
+    the brackets themselves are visited in Python.
+
+    :return: The index of the matching closing bracket, or -1 if there is none
+    """
+    bracket_count = 0
+    for match in _bracket_pattern(open_char, close_char).finditer(text, open_pos):
+        if match.group() == open_char:
+            bracket_count += 1
+        else:
+            bracket_count -= 1
+            if bracket_count == 0:
+                return match.start()
+    return -1
+
+
+# Tokens that matter for finding block boundaries. Comments, heredocs and
+# strings are matched first so braces inside them are never counted. An
+# unterminated comment or heredoc runs to the end of the file, so a file full
+# of openers is consumed by the first one instead of rescanned from each.
+# Attribute names only start where a name cannot continue and never give
+# back characters, so a long run like a-a-a-... is scanned once, not once
+# per hyphen.
+_TF_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>\#[^\n]*|//[^\n]*|/\*.*?(?:\*/|\Z))
+    | (?P<heredoc><<-?(?P<tag>\w+)\n.*?(?:\n[ \t]*(?P=tag)\b|\Z))
+    | (?P<string>"(?:\\.|[^"\\\n])*")
+    | (?P<attribute>(?<![\w-])(?P<name>[A-Za-z_][\w-]*+)\s*=(?!=))
+    | (?P<header>\b(?P<kind>[a-z_]+)(?P<labels>(?:\s+"[^"\n]*")*)\s*\{)
+    | (?P<open>\{)
+    | (?P<close>\})
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+_LABEL_RE = re.compile(r'"([^"\n]*)"')
+_SOURCE_ATTRIBUTE_RE = re.compile(r'\bsource\s*=\s*"([^"]*)"')
+# The value following an attribute's "=", either a string on the same line or
+# the first token of an unquoted expression
+_ATTRIBUTE_VALUE_RE = re.compile(
+    r'[ \t]*(?:"(?P<quoted>(?:\\.|[^"\\\n])*)"|(?P<unquoted>[^\s"{\[]\S*))'
+)
+
+
+@dataclass(frozen=True)
+class _Block:
+    """A top-level block in a Terraform file, located by its offsets."""
+
+    kind: str
+    labels: tuple[str, ...]
+    start: int
+    open_pos: int
+    close_pos: int
+    source: Optional[str] = None
+    source_span: tuple[int, int] = (-1, -1)
+    # Names of the attributes assigned directly in the block body
+    attributes: frozenset[str] = frozenset()
+
+    @property
+    def body(self) -> tuple[int, int]:
+        return self.open_pos + 1, self.close_pos
+
+
+def _index_blocks(text: str) -> list[_Block]:
+    """Tokenize a Terraform file once and return its top-level blocks.
+
+    The names of the attributes set directly in each block are collected
+    in the same pass. For module blocks, the value and offsets of the
+    top-level source attribute are recorded as well, so a source in a
+    comment, string or nested object is never mistaken for it.
+    """
+    blocks = []
+    depth = 0
+    header = None
+    attributes = set()
+    source = None
+    for token in _TF_TOKEN_RE.finditer(text):
+        if token.lastgroup in ("comment", "heredoc", "string"):
+            continue
+        if token.lastgroup == "attribute":
+            if depth == 1 and header is not None:
+                name = token.group("name")
+                if name == "source" and name not in attributes:
+                    source = _ATTRIBUTE_VALUE_RE.match(text, token.end())
+                attributes.add(name)
+            continue
+        if token.lastgroup == "close":
+            depth -= 1
+            if depth == 0 and header is not None:
+                blocks.append(
+                    _make_block(header, token.start(), frozenset(attributes), source)
+                )
+                header = None
+            depth = max(depth, 0)
+            continue
+        if depth == 0 and token.group("header"):
+            header = token
+            attributes = set()
+            source = None
+        depth += 1
+    return blocks
+
+
+def _make_block(
+    header: re.Match,
+    close_pos: int,
+    attributes: frozenset[str],
+    source: Optional[re.Match],
+) -> _Block:
+    kind = header.group("kind")
+    labels = tuple(_LABEL_RE.findall(header.group("labels")))
+    source_value, source_span = None, (-1, -1)
+    # Only a quoted module source can be read or rewritten
+    if kind == "module" and source is not None and source.group("quoted") is not None:
+        source_value, source_span = source.group("quoted"), source.span("quoted")
+    return _Block(
+        kind,
+        labels,
+        header.start(),
+        header.end() - 1,
+        close_pos,
+        source=source_value,
+        source_span=source_span,
+        attributes=attributes,
+    )
+
+
+def _iter_module_blocks(text: str, name: Optional[str] = None) -> Iterator[_Block]:
+    """Yield the top-level module blocks in text, optionally only the named one."""
+    for block in _index_blocks(text):
+        if block.kind != "module" or not block.labels:
+            continue
+        if name is None or block.labels[0] == name:
+            yield block
+
+
+def _iter_attributes(body: str) -> Iterator[tuple[str, str, bool]]:
+    """Yield (name, value, quoted) for the top-level attributes of a block body.
+
+    The body is tokenized like a whole file, so braces inside strings,
+    comments and heredocs never affect which attributes count as top-level.
+    Quoted values are returned without their quotes, other values as their
+    first token. Values that open a nested object or list are skipped.
+    """
+    depth = 0
+    for token in _TF_TOKEN_RE.finditer(body):
+        kind = token.lastgroup
+        if kind == "close":
+            depth = max(depth - 1, 0)
+        elif kind in ("open", "header"):
+            depth += 1
+        elif kind == "attribute" and depth == 0:
+            value = _ATTRIBUTE_VALUE_RE.match(body, token.end())
+            if value is None:
+                continue
+            if value.group("quoted") is not None:
+                yield token.group("name"), value.group("quoted"), True
+            else:
+                yield token.group("name"), value.group("unquoted"), False
+
+
+def _is_module_source(source: Optional[str], base_source: str) -> bool:
+    """Check if source is base_source, optionally pinned with ?ref=."""
+    if source is None:
+        return False
+    return source == base_source or source.startswith(f"{base_source}?ref=")
+
+
+@functools.lru_cache(maxsize=64)
+def _provider_versions_pattern(provider_names: tuple[str, ...]) -> re.Pattern:
+    """Compile the pattern matching the version of any of the given providers.
+
+    Pattern: provider_name = { ... version = "old_version" ... }
+    """
+    alternatives = "|".join(map(re.escape, provider_names))
+    return re.compile(rf'\b({alternatives})(\s*=\s*{{[^}}]*?version\s*=\s*)"[^"]*"')
+
+
+# Files larger than this are skipped when scanning Terraform folders
+_MAX_TF_FILE_SIZE = 8 * 1024 * 1024
+
+
+# Directories that never contain the project's own Terraform configuration
+_SKIPPED_DIRECTORIES = frozenset(
+    {".terraform", ".terragrunt-cache", ".git", "node_modules", ".venv"}
+)
+
+
+def _iter_tf_files(root: Path | str) -> Iterator[os.DirEntry]:
+    """Recursively yield the entries of all non-empty .tf files below root.
+
+    Uses os.scandir directly so file type information from the directory
+    listing is reused instead of building and stat-ing a Path per entry.
+    Tool and cache directories such as .terraform, which holds downloaded
+    copies of providers and modules, are not descended into.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in _SKIPPED_DIRECTORIES:
+                        stack.append(entry.path)
+                elif entry.name.endswith(".tf"):
+                    # Empty files have nothing to scan and huge ones are not
+                    # hand-written Terraform, so neither is worth reading
+                    if 0 < entry.stat().st_size <= _MAX_TF_FILE_SIZE:
+                        yield entry
+
+
+# Files that conventionally hold the backend configuration, most likely first
+_BACKEND_FILE_NAMES = (
+    "backend.tf",
+    "main.tf",
+    "terraform.tf",
+    "providers.tf",
+    "versions.tf",
+)
+
+
+def _backend_file_priority(entry: os.DirEntry) -> int:
+    try:
+        return _BACKEND_FILE_NAMES.index(entry.name)
+    except ValueError:
+        return len(_BACKEND_FILE_NAMES)
+
+
+@dataclass
+class _TerraformFile:
+    """A Terraform file's content, with each kind of scan run at most once.
+
+    Instances are cached per (path, content), so several lookups on the
+    same folder during a migration share one parse per unchanged file.
+    The file is kept as bytes and only decoded once a lookup needs it.
+    """
+
+    path: str
+    data: bytes
+
+    @functools.cached_property
+    def content(self) -> str:
+        return self.data.decode("utf-8")
+
+    def mentions(self, text: str) -> bool:
+        """Check if text occurs in the file, without decoding it."""
+        return text.encode("utf-8") in self.data
+
+    @functools.cached_property
+    def blocks(self) -> list[_Block]:
+        return _index_blocks(self.content)
+
+    @functools.cached_property
+    def modules(self) -> list[_Block]:
+        return [block for block in self.blocks if block.kind == "module"]
+
+    @functools.cached_property
+    def parameters(self) -> dict[tuple[str, str], list[str]]:
+        """String attributes of resource and data blocks, keyed by (type, name)."""
+        parameters = {}
+        for block in self.blocks:
+            if block.kind not in ("resource", "data") or len(block.labels) < 2:
+                continue
+            seen = set()
+            body = self.content[slice(*block.body)]
+            for name, value, quoted in _iter_attributes(body):
+                if quoted and name not in seen:
+                    seen.add(name)
+                    parameters.setdefault((block.labels[0], name), []).append(value)
+        return parameters
+
+    @functools.cached_property
+    def providers(self) -> dict[str, dict[str, Optional[str]]]:
+        """The entries of all required_providers blocks, keyed by provider name."""
+        providers = {}
+        for block_match in _REQUIRED_PROVIDERS_RE.finditer(self.content):
+            block_end = _find_closing_bracket(self.content, block_match.end() - 1)
+            if block_end == -1:
+                continue  # Couldn't find matching bracket
+
+            position = block_match.end()
+            while entry := _PROVIDER_ENTRY_RE.search(self.content, position, block_end):
+                entry_end = _find_closing_bracket(self.content, entry.end() - 1)
+                if entry_end == -1:
+                    break
+                position = entry_end + 1
+
+                entry_body = self.content[entry.end() : entry_end]
+                version_match = _VERSION_ATTRIBUTE_RE.search(entry_body)
+                source_match = _SOURCE_ATTRIBUTE_RE.search(entry_body)
+                providers.setdefault(
+                    entry.group(1),
+                    {
+                        "version": version_match.group(1) if version_match else None,
+                        "source": source_match.group(1) if source_match else None,
+                    },
+                )
+        return providers
+
+    @functools.cached_property
+    def account_id(self) -> Optional[str]:
+        """The account ID prefix of the first S3 backend bucket in the file."""
+        # Only files configuring the S3 backend are worth decoding and scanning
+        if not (self.mentions("backend") and self.mentions('"s3"')):
+            return None
+        bucket_match = _BUCKET_RE.search(self.content)
+        return bucket_match.group(1) if bucket_match else None
+
+
+@functools.lru_cache(maxsize=512)
+def _parse_tf_file(path: str, data: bytes) -> _TerraformFile:
+    """Wrap a Terraform file's bytes. Keyed on the bytes, so edits never hit."""
+    return _TerraformFile(path, data)
+
+
+def _read_bytes(path: str, size_hint: int) -> bytes:
+    """Read a whole file with raw os calls, skipping the file object setup.
+
+    Reads until end of file, so a file that grew since size_hint was taken
+    is still read completely.
+    """
+    # O_BINARY only exists on Windows, where it stops newline translation
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        chunks = []
+        while chunk := os.read(fd, size_hint + 1):
+            chunks.append(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+def _read_tf_file(entry: os.DirEntry) -> _TerraformFile:
+    # The file is always read, as stat values can stay the same across a
+    # same-size rewrite. Only the parsing is reused for unchanged content.
+    data = _read_bytes(entry.path, entry.stat().st_size)
+    return _parse_tf_file(entry.path, data)
+
+
+def _read_tf_files(entries: Iterable[os.DirEntry]) -> Iterator[_TerraformFile]:
+    """Read files one at a time, in input order.
+
+    Files are only read as iteration reaches them, so a lookup that stops
+    early never reads the rest of the folder.
+    """
+    for entry in entries:
+        yield _read_tf_file(entry)
+
 
 class RegexTerraformModifier(Terraform):
     """Implementation of TerraformModifier that uses regex to modify Terraform files."""
@@ -18,15 +447,17 @@ class RegexTerraformModifier(Terraform):
         :param terraform_config: The content of the Terraform file
         :return: The modified Terraform configuration with vydev data sources removed
         """
-        # Pattern that handles nested braces (like ${var.name})
-        # Matches: data "vy_artifact_version" "name" { ... }
-        # where { ... } can contain nested braces like ${var.foo}
-        vydev_pattern = (
-            r'data\s+"vy_artifact_version"\s+"[^"]*"\s+\{(?:[^{}]|\{[^{}]*\})*\}'
-        )
+        # Cut out every data "vy_artifact_version" "name" { ... } block
+        parts = []
+        last_pos = 0
+        for block in _index_blocks(terraform_config):
+            if block.kind != "data" or block.labels[:1] != ("vy_artifact_version",):
+                continue
+            parts.append(terraform_config[last_pos : block.start])
+            last_pos = block.close_pos + 1
 
-        # Remove all matching data blocks
-        return re.sub(vydev_pattern, "", terraform_config)
+        parts.append(terraform_config[last_pos:])
+        return "".join(parts)
 
     def add_data_source(
         self: Self,
@@ -44,18 +475,17 @@ class RegexTerraformModifier(Terraform):
         :param variables: Dictionary of variables to set in the data source
         :return: The modified Terraform configuration with the new data source
         """
-        # Start building the data source block
-        data_block = f'data "{resource}" "{name}" {{\n'
-
-        # Add variables to the block
-        for var_name, var_value in variables.items():
-            data_block += f'  {var_name} = "{var_value}"\n'
-
-        # Close the data block
-        data_block += "}\n"
+        body = "".join(
+            f'  {var_name} = "{var_value}"\n'
+            for var_name, var_value in variables.items()
+        )
 
         # Append the new data source to the configuration
-        return terraform_config + "\n" + data_block
+        return (
+            terraform_config
+            + "\n"
+            + _DATA_SOURCE_TEMPLATE.format(resource=resource, name=name, body=body)
+        )
 
     def replace_image_tag_on_ecs_module(
         self: Self,
@@ -68,30 +498,32 @@ class RegexTerraformModifier(Terraform):
         :param vy_ecs_image_data_source_name: Name of the Vy ECS Image Data source
         :return: The modified Terraform configuration with updated image tag
         """
-        # Pattern that handles nested blocks by using .*? with DOTALL and lookahead
-        # to stop at the next top-level Terraform block
-        module_pattern = r'module\s+"([^"]+)"\s+\{(.*?)\}(?=\s*(?:module|resource|data|variable|output|locals|provider|\Z))'
+        # Cheap literal check before tokenizing the config
+        if _ECS_MODULE_SOURCE not in terraform_config:
+            return terraform_config
 
-        def replace_image(match):
-            module_name = match.group(1)
-            module_content = match.group(2)
+        # Replace image line with reference to ECR repository
+        new_variable = (
+            f"\n    image = data.vy_ecs_image.{vy_ecs_image_data_source_name}"
+        )
+        parts = []
+        last_pos = 0
+        for block in _index_blocks(terraform_config):
+            if block.kind != "module":
+                continue
+            body_start, body_end = block.body
+            module_content = terraform_config[body_start:body_end]
 
             # Check if this is an ECS service module
-            if "github.com/nsbno/terraform-aws-ecs-service" not in module_content:
-                return match.group(0)  # Return unchanged if not ECS module
-
-            # Replace image line with reference to ECR repository
-            new_variable = (
-                f"\n    image = data.vy_ecs_image.{vy_ecs_image_data_source_name}"
-            )
-            # Find and replace the image line
-            # Pattern matches both quoted strings and unquoted references (local.x, var.x, etc.)
-            image_pattern = r"\s+image\s*=\s*(?:\"[^\"]*\"|[^\s\n]+)"
-            modified_content = re.sub(image_pattern, new_variable, module_content)
+            if _ECS_MODULE_SOURCE not in module_content:
+                continue
 
-            return f'module "{module_name}" {{{modified_content}}}'
+            parts.append(terraform_config[last_pos:body_start])
+            parts.append(_IMAGE_RE.sub(new_variable, module_content))
+            last_pos = body_end
 
-        return re.sub(module_pattern, replace_image, terraform_config, flags=re.DOTALL)
+        parts.append(terraform_config[last_pos:])
+        return "".join(parts)
 
     def find_provider(
         self: Self, target_provider: str, terraform_folder: Path
@@ -103,52 +535,20 @@ class RegexTerraformModifier(Terraform):
         :param terraform_folder: The folder path containing Terraform files
         :return: Dictionary with provider details if found, None otherwise
         """
-        # Pattern to find the target provider block within required_providers
-        # This matches: provider_name = { ... }
-        provider_pattern = rf"{target_provider}\s*=\s*{{"
-
         # Read all .tf files from the terraform folder
-        tf_files = terraform_folder.glob("**/*.tf")
-        for tf_file in tf_files:
-            with open(tf_file, "r") as f:
-                content = f.read()
-                match = re.search(provider_pattern, content)
-                if match:
-                    start_pos = match.end() - 1  # Position of opening '{'
-                    bracket_count = 0
-                    end_pos = -1
-
-                    for i in range(start_pos, len(content)):
-                        if content[i] == "{":
-                            bracket_count += 1
-                        elif content[i] == "}":
-                            bracket_count -= 1
-                            if bracket_count == 0:
-                                end_pos = i
-                                break
-
-                    if end_pos == -1:
-                        continue  # Couldn't find matching bracket
-
-                    # Extract the provider block content
-                    provider_block = content[start_pos + 1 : end_pos]
-
-                    # Extract version from the provider block
-                    version_match = re.search(
-                        r'version\s*=\s*"([^"]*)"', provider_block
-                    )
-                    version = version_match.group(1) if version_match else None
-
-                    # Extract source if present
-                    source_match = re.search(r'source\s*=\s*"([^"]*)"', provider_block)
-                    source = source_match.group(1) if source_match else None
+        for tf_file in _read_tf_files(_iter_tf_files(terraform_folder)):
+            if not tf_file.mentions(target_provider):
+                continue
+            provider = tf_file.providers.get(target_provider)
+            if provider is None:
+                continue
 
-                    return {
-                        "name": target_provider,
-                        "version": version,
-                        "source": source,
-                        "file": Path(tf_file),
-                    }
+            return {
+                "name": target_provider,
+                "version": provider["version"],
+                "source": provider["source"],
+                "file": Path(tf_file.path),
+            }
 
         return None
 
@@ -165,62 +565,45 @@ class RegexTerraformModifier(Terraform):
         :return: The modified Terraform configuration with updated provider versions
         """
         modified_config = terraform_config
-        # Pattern to find required_providers block start
-        provider_block_start_pattern = r"required_providers\s+{"
 
         # Check if required_providers block exists
-        required_providers_match = re.search(provider_block_start_pattern, modified_config)
+        required_providers_match = _REQUIRED_PROVIDERS_RE.search(modified_config)
 
         if required_providers_match:
             start_pos = required_providers_match.end() - 1  # Position of opening '{'
-            bracket_count = 0
-            end_pos = -1
-
-            for i in range(start_pos, len(modified_config)):
-                if modified_config[i] == "{":
-                    bracket_count += 1
-                elif modified_config[i] == "}":
-                    bracket_count -= 1
-                    if bracket_count == 0:
-                        end_pos = i
-                        break
-
-            if end_pos != -1:
+            end_pos = _find_closing_bracket(modified_config, start_pos)
+
+            if end_pos != -1 and target_providers:
                 # Extract the full required_providers block including the braces
                 block_start = required_providers_match.start()
-                full_block = modified_config[block_start : end_pos + 1]
-                block_text = full_block
-
-                # Update each provider version within the block
-                for provider_name, new_version in target_providers.items():
-                    # Match provider configuration and update version
-                    # Pattern: provider_name = { ... version = "old_version" ... }
-                    # Use non-greedy match with DOTALL to handle nested braces
-                    provider_pattern = f'({provider_name}\\s*=\\s*{{.*?version\\s*=\\s*)"[^"]*"'
-
-                    # Update version while preserving formatting
-                    updated_block = re.sub(
-                        provider_pattern, f'\\1"{new_version}"', block_text, flags=re.DOTALL
-                    )
+                block_text = modified_config[block_start : end_pos + 1]
 
-                    block_text = updated_block
+                # Match every target provider in a single pass
+                provider_pattern = _provider_versions_pattern(tuple(target_providers))
 
-                # Replace old block with updated one
-                modified_config = modified_config.replace(full_block, block_text)
-            else:
-                # If we couldn't find the closing brace, fall back to the old behavior
-                # (This shouldn't happen with valid Terraform config)
-                pass
+                def replace_version(match: re.Match) -> str:
+                    new_version = target_providers[match.group(1)]
+                    return f'{match.group(1)}{match.group(2)}"{new_version}"'
+
+                # Update versions while preserving formatting
+                block_text = provider_pattern.sub(replace_version, block_text)
+
+                # Splice the updated block back in place
+                modified_config = (
+                    modified_config[:block_start]
+                    + block_text
+                    + modified_config[end_pos + 1 :]
+                )
         else:
             # If no required_providers block exists, create one
-            providers_text = "terraform {\n  required_providers {\n"
-            for provider_name, version in target_providers.items():
-                providers_text += (
-                    f'    {provider_name} = {{\n      version = "{version}"\n    }}\n'
-                )
-            providers_text += "  }\n}\n"
+            body = "".join(
+                f'    {provider_name} = {{\n      version = "{version}"\n    }}\n'
+                for provider_name, version in target_providers.items()
+            )
 
-            modified_config = providers_text + modified_config
+            modified_config = (
+                _REQUIRED_PROVIDERS_TEMPLATE.format(body=body) + modified_config
+            )
 
         return modified_config
 
@@ -231,16 +614,13 @@ class RegexTerraformModifier(Terraform):
         :param folder: The folder path containing Terraform files
         :return: AWS account ID extracted from the bucket name
         """
-        folder_path = Path(folder)
-        tf_files = folder_path.glob("**/*.tf")
-
-        for tf_file in tf_files:
-            with open(tf_file, "r") as f:
-                content = f.read()
-                # Look for backend configuration with S3 bucket
-                bucket_match = re.search(r'bucket\s*=\s*"(\d+)-[^"]*"', content)
-                if bucket_match:
-                    return bucket_match.group(1)
+        # Read the files that usually hold the backend first, so the lookup
+        # can stop before reading the rest of the folder
+        tf_files = sorted(_iter_tf_files(folder), key=_backend_file_priority)
+        for tf_file in _read_tf_files(tf_files):
+            # Look for backend configuration with S3 bucket
+            if tf_file.account_id is not None:
+                return tf_file.account_id
 
         raise ValueError(f"Could not find account ID in Terraform files in {folder}")
 
@@ -255,17 +635,16 @@ class RegexTerraformModifier(Terraform):
         # Remove any existing ?ref= parameter from the module source
         base_source = module_source.split("?")[0]
 
-        # Create a pattern to match modules with the specified source
-        module_pattern = rf'source\s*=\s*"({re.escape(base_source)}(?:\?ref=[^"]*)?)"'
-
         # Read all .tf files from the infrastructure folder
-        tf_files = infrastructure_folder.glob("**/*.tf")
-        for tf_file in tf_files:
-            with open(tf_file, "r") as f:
-                content = f.read()
-                # Search for the pattern in the terraform config
-                if re.search(module_pattern, content, re.MULTILINE):
-                    return True
+        for tf_file in _read_tf_files(_iter_tf_files(infrastructure_folder)):
+            # Skip parsing entirely for files that never mention the source
+            if not tf_file.mentions(base_source):
+                continue
+            if any(
+                _is_module_source(block.source, base_source)
+                for block in tf_file.modules
+            ):
+                return True
 
         return False
 
@@ -281,33 +660,31 @@ class RegexTerraformModifier(Terraform):
         :param target_modules: A dictionary where keys are module sources and values are the new versions
         :return: The modified Terraform configuration with updated module versions
         """
-        modified_config = terraform_config
-
-        for module_source, new_version in target_modules.items():
-            # For testing purposes, use a simpler approach
-            # Find modules with the specified source and update the source URL with ?ref=version
-            base_source = module_source.split("?")[
-                0
-            ]  # Remove any existing ?ref= parameter
-            module_pattern = f'module\\s+"[^"]+"\\s+{{[^}}]*?source\\s+\\=\\s+"({re.escape(base_source)}(?:\\?ref=[^"]*)?)"[^}}]*?}}'
-
-            for module_match in re.finditer(module_pattern, modified_config, re.DOTALL):
-                module_text = module_match.group(0)
-                current_source = module_match.group(1)
-
-                # Create the new source with the updated version
-                new_source = f"{base_source}?ref={new_version}"
-
-                # Find and replace the source attribute with proper whitespace preserved
-                source_pattern = f'(source\\s+\\=\\s+)"{re.escape(current_source)}"'
-                updated_module = re.sub(
-                    source_pattern, f'\\1"{new_source}"', module_text
-                )
+        # Map base sources (without any ?ref= parameter) to the new versions
+        target_versions = {
+            module_source.split("?")[0]: new_version
+            for module_source, new_version in target_modules.items()
+        }
+
+        # Rewrite the source of every matching module in a single pass
+        parts = []
+        last_pos = 0
+        for block in _index_blocks(terraform_config):
+            if block.kind != "module" or block.source is None:
+                continue
+            base_source = block.source.split("?")[0]
+            if base_source not in target_versions:
+                continue
+            if not _is_module_source(block.source, base_source):
+                continue
 
-                # Replace the module in the config
-                modified_config = modified_config.replace(module_text, updated_module)
+            source_start, source_end = block.source_span
+            parts.append(terraform_config[last_pos:source_start])
+            parts.append(f"{base_source}?ref={target_versions[base_source]}")
+            last_pos = source_end
 
-        return modified_config
+        parts.append(terraform_config[last_pos:])
+        return "".join(parts)
 
     def add_module(
         self: Self,
@@ -330,34 +707,18 @@ class RegexTerraformModifier(Terraform):
         if variables is None:
             variables = {}
 
-        # Start building the module block
         source_with_version = source if not version else f"{source}?ref={version}"
-        module_block = f'module "{name}" {{\n  source = "{source_with_version}"'
-
-        for var_name, var_value in variables.items():
-            # Handle different types of values
-            if isinstance(var_value, str):
-                if not (
-                    var_value.startswith("module.") or var_value.startswith("var.")
-                ):
-                    # If the value doesn't start with "module." or "var.", wrap it in quotes
-                    var_value = f'"{var_value}"'
-
-                module_block += f"\n  {var_name} = {var_value}"
-            elif isinstance(var_value, bool):
-                module_block += f"\n  {var_name} = {str(var_value).lower()}"
-            elif isinstance(var_value, dict):
-                raise NotImplementedError(
-                    "If you see this, you need to implement dicts in the TF function"
-                )
-            else:
-                module_block += f"\n  {var_name} = {var_value}"
-
-        # Close the module block
-        module_block += "\n}\n"
+        body = "".join(
+            f"  {var_name} = {_format_value(var_value)}\n"
+            for var_name, var_value in variables.items()
+        )
 
         # Append the new module to the configuration
-        return terraform_config + "\n" + module_block
+        return (
+            terraform_config
+            + "\n"
+            + _MODULE_TEMPLATE.format(name=name, source=source_with_version, body=body)
+        )
 
     def find_module(
         self: Self, module_source: str, infrastructure_folder: Path
@@ -372,42 +733,35 @@ class RegexTerraformModifier(Terraform):
         # Remove any existing ?ref= parameter from the module source
         base_source = module_source.split("?")[0]
 
-        # Create a pattern to match modules with the specified source and capture module details
-        module_pattern = rf'module\s+"([^"]+)"\s+{{\s*([^}}]*?source\s*=\s*"({re.escape(base_source)}(?:\?ref=([^"]*))?)"[^}}]*?)}}'
-
         # Read all .tf files from the infrastructure folder
-        tf_files = infrastructure_folder.glob("**/*.tf")
-        for tf_file in tf_files:
-            with open(tf_file, "r") as f:
-                content = f.read()
-                # Search for the pattern in the terraform config
-                for match in re.finditer(module_pattern, content, re.DOTALL):
-                    module_name = match.group(1)
-                    module_block = match.group(2)
-                    module_source_value = match.group(3)
-                    module_version = match.group(4) if match.group(4) else None
-
-                    # Extract variables from the module block
-                    variables = {}
-                    var_pattern = r'(\w+)\s*=\s*(?:"([^"]*)"|(\w+))'
-                    for var_match in re.finditer(var_pattern, module_block):
-                        var_name = var_match.group(1)
-                        if var_name == "source":  # Skip the source attribute
-                            continue
-                        var_value = (
-                            var_match.group(2)
-                            if var_match.group(2) is not None
-                            else var_match.group(3)
-                        )
-                        variables[var_name] = var_value
-
-                    return {
-                        "name": module_name,
-                        "source": module_source_value,
-                        "version": module_version,
-                        "variables": variables,
-                        "file_path": Path(tf_file),
-                    }
+        for tf_file in _read_tf_files(_iter_tf_files(infrastructure_folder)):
+            if not tf_file.mentions(base_source):
+                continue
+            for block in tf_file.modules:
+                if not _is_module_source(block.source, base_source):
+                    continue
+
+                module_name = block.labels[0] if block.labels else None
+                module_source_value = block.source
+                _, _, module_version = module_source_value.partition("?ref=")
+                module_version = module_version or None
+                module_block = tf_file.content[slice(*block.body)]
+
+                # Extract top-level variables from the module block, skipping
+                # the source attribute
+                variables = {
+                    var_name: var_value
+                    for var_name, var_value, _ in _iter_attributes(module_block)
+                    if var_name != "source"
+                }
+
+                return {
+                    "name": module_name,
+                    "source": module_source_value,
+                    "version": module_version,
+                    "variables": variables,
+                    "file_path": Path(tf_file.path),
+                }
 
         return None
 
@@ -422,52 +776,33 @@ class RegexTerraformModifier(Terraform):
         :param variables: Dictionary of variables to add to the module
         :return: The modified Terraform configuration with added variables
         """
-        # Find the module declaration start
-        module_start_pattern = rf'module\s+"{re.escape(target_module)}"\s+{{'
-        module_start_match = re.search(module_start_pattern, terraform_config)
-
-        if not module_start_match:
-            raise NotFoundError(
-                f"Could not find module '{target_module}' in the Terraform configuration"
-            )
-
-        # Use bracket counting to find the matching closing brace
-        start_pos = module_start_match.end() - 1  # Position of opening '{'
-        bracket_count = 0
-        end_pos = -1
-
-        for i in range(start_pos, len(terraform_config)):
-            if terraform_config[i] == "{":
-                bracket_count += 1
-            elif terraform_config[i] == "}":
-                bracket_count -= 1
-                if bracket_count == 0:
-                    end_pos = i
-                    break
-
-        if end_pos == -1:
+        # Find the module block, skipping braces in strings and comments
+        block = next(_iter_module_blocks(terraform_config, target_module), None)
+
+        if block is None:
+            if not re.search(
+                rf'module\s+"{re.escape(target_module)}"\s+{{', terraform_config
+            ):
+                raise NotFoundError(
+                    f"Could not find module '{target_module}' in the Terraform configuration"
+                )
             raise NotFoundError(
                 f"Could not find matching closing brace for module '{target_module}'"
             )
 
+        start_pos = block.open_pos
+        end_pos = block.close_pos
+
         # Extract module content
-        module_start = module_start_match.start()
+        module_start = block.start
         module_content = terraform_config[start_pos + 1 : end_pos]
 
         # Build the variable assignments
-        var_assignments = ""
+        assignments = []
         for var_name, var_value in variables.items():
-            # Handle different types of values
-            if isinstance(var_value, str):
-                var_assignments += f'\n  {var_name} = "{var_value}"'
-            elif isinstance(var_value, bool):
-                var_assignments += f"\n  {var_name} = {str(var_value).lower()}"
-            elif isinstance(var_value, dict):
-                raise NotImplementedError(
-                    "If you see this, you need to implement dicts in the TF function"
-                )
-            else:
-                var_assignments += f"\n  {var_name} = {var_value}"
+            value = _format_value(var_value)
+            assignments.append(f"\n  {var_name} = {value}")
+        var_assignments = "".join(assignments)
 
         # Build the modified module
         modified_module = (
@@ -478,9 +813,12 @@ class RegexTerraformModifier(Terraform):
             + terraform_config[end_pos : end_pos + 1]
         )
 
-        # Replace the module in the config
-        original_module = terraform_config[module_start : end_pos + 1]
-        return terraform_config.replace(original_module, modified_module)
+        # Splice the modified module into the config at its known offsets
+        return (
+            terraform_config[:module_start]
+            + modified_module
+            + terraform_config[end_pos + 1 :]
+        )
 
     def add_test_listener_to_ecs_module(
         self: Self, terraform_config: str, metadata_module_name: str
@@ -494,26 +832,19 @@ class RegexTerraformModifier(Terraform):
         :param metadata_module_name: The name of the metadata module to reference
         :return: The modified Terraform configuration with added test_listener_arn to lb_listeners
         """
-        # Find the ECS module in the config
-        target_module_name = "github.com/nsbno/terraform-aws-ecs-service"
-        module_pattern = (
-            r'module\s+"([^"]+)"\s+{(.*?)}(?=\s*(?:module|resource|data|provider|\Z))'
-        )
-
-        for module_match in re.finditer(module_pattern, terraform_config, re.DOTALL):
-            module_name = module_match.group(1)
-            module_content = module_match.group(2)
+        # Cheap literal check before looking at any module blocks
+        if _ECS_MODULE_SOURCE not in terraform_config:
+            return terraform_config
 
+        for block in _iter_module_blocks(terraform_config):
             # Check if this is the ECS module
-            source_match = re.search(
-                rf'source\s*=\s*"{re.escape(target_module_name)}(?:\?ref=[^"]*)?',
-                module_content,
-            )
-            if not source_match:
+            if not block.source or not block.source.startswith(_ECS_MODULE_SOURCE):
                 continue
+            open_pos, close_pos = block.open_pos, block.close_pos
+            module_content = terraform_config[open_pos + 1 : close_pos]
 
             # Found the ECS module, now look for lb_listeners using bracket counting
-            lb_listeners_start = re.search(r"lb_listeners\s*=\s*\[", module_content)
+            lb_listeners_start = _LB_LISTENERS_RE.search(module_content)
             if not lb_listeners_start:
                 continue
 
@@ -522,27 +853,14 @@ class RegexTerraformModifier(Terraform):
                 continue
 
             # Find the matching closing bracket for lb_listeners array
-            start_pos = lb_listeners_start.end() - 1  # Position of '['
-            bracket_count = 0
-            end_pos = -1
-
-            for i in range(start_pos, len(module_content)):
-                if module_content[i] == "[":
-                    bracket_count += 1
-                elif module_content[i] == "]":
-                    bracket_count -= 1
-                    if bracket_count == 0:
-                        end_pos = i
-                        break
-
+            end_pos = _find_closing_bracket(
+                module_content, lb_listeners_start.end() - 1, "[", "]"
+            )
             if end_pos == -1:
                 continue  # Couldn't find matching bracket
 
-            # Extract the full lb_listeners declaration
-            lb_listeners_full = module_content[lb_listeners_start.start() : end_pos + 1]
-
             # Find the first '{' inside the array to insert test_listener_arn after it
-            first_brace = lb_listeners_full.find("{")
+            first_brace = module_content.find("{", lb_listeners_start.end(), end_pos)
             if first_brace == -1:
                 continue
 
@@ -552,23 +870,14 @@ class RegexTerraformModifier(Terraform):
             )
             test_listener_line = f"\n      test_listener_arn = {test_listener_value}\n"
 
-            modified_lb_listeners = (
-                lb_listeners_full[: first_brace + 1]
+            # Splice the new line into the config at the known offset
+            insert_pos = open_pos + 1 + first_brace + 1
+            return (
+                terraform_config[:insert_pos]
                 + test_listener_line
-                + lb_listeners_full[first_brace + 1 :]
-            )
-
-            # Replace in module content
-            modified_module_content = module_content.replace(
-                lb_listeners_full, modified_lb_listeners
+                + terraform_config[insert_pos:]
             )
 
-            # Replace the module in the config
-            original_module = module_match.group(0)
-            modified_module = f'module "{module_name}" {{{modified_module_content}}}'
-
-            return terraform_config.replace(original_module, modified_module)
-
         # If we didn't find the module or lb_listeners, return the original config
         return terraform_config
 
@@ -583,47 +892,22 @@ class RegexTerraformModifier(Terraform):
         :param terraform_config: The content of the Terraform file
         :return: The modified Terraform configuration with force_new_deployment added
         """
-        # Find the ECS module in the config to get its name
-        target_module_source = "github.com/nsbno/terraform-aws-ecs-service"
-
-        # Find all module declarations using regex
-        module_start_pattern = r'module\s+"([^"]+)"\s+\{'
-
-        for module_match in re.finditer(module_start_pattern, terraform_config):
-            module_name = module_match.group(1)
-            start_pos = module_match.end() - 1  # Position of opening '{'
-
-            # Use bracket counting to find the matching closing brace
-            bracket_count = 0
-            end_pos = -1
-
-            for i in range(start_pos, len(terraform_config)):
-                if terraform_config[i] == "{":
-                    bracket_count += 1
-                elif terraform_config[i] == "}":
-                    bracket_count -= 1
-                    if bracket_count == 0:
-                        end_pos = i
-                        break
-
-            if end_pos == -1:
-                continue  # Couldn't find matching bracket
-
-            # Extract module content
-            module_content = terraform_config[start_pos + 1 : end_pos]
+        # Cheap literal check before looking at any module blocks
+        if _ECS_MODULE_SOURCE not in terraform_config:
+            raise NotFoundError("No ECS module was found in the configuration.")
 
+        # Find the ECS module in the config to get its name
+        for block in _iter_module_blocks(terraform_config):
             # Check if this is the ECS module
-            source_match = re.search(
-                rf'source\s*=\s*"{re.escape(target_module_source)}(?:\?ref=[^"]*)?',
-                module_content,
-            )
-            if not source_match:
+            if not block.source or not block.source.startswith(_ECS_MODULE_SOURCE):
                 continue
 
             # Check if force_new_deployment already exists
-            if "force_new_deployment" in module_content:
+            if "force_new_deployment" in block.attributes:
                 return terraform_config
 
+            module_name = block.labels[0]
+
             # Use add_variable to add force_new_deployment = true
             return self.add_variable(
                 terraform_config, module_name, {"force_new_deployment": True}
@@ -644,18 +928,12 @@ class RegexTerraformModifier(Terraform):
         :param module_folder: The folder path containing Terraform files
         :return: List of parameter values found
         """
-        tf_files = module_folder.glob("**/*.tf")
         values = []
-
-        for tf_file in tf_files:
-            if ".terraform" in str(tf_file):
+        for tf_file in _read_tf_files(_iter_tf_files(module_folder)):
+            # Files that never mention the quoted type cannot contain the block
+            if not tf_file.mentions(f'"{type_}"'):
                 continue
-            with open(tf_file, "r") as f:
-                content = f.read()
-                # Pattern for both resource and data blocks
-                resource_pattern = f'(?:resource|data)\\s+"{type_}"\\s+"[^"]+"\\s+{{[^}}]*?{parameter}\\s*=\\s*"([^"]*)"[^}}]*}}'
-                matches = re.finditer(resource_pattern, content, re.DOTALL)
-                values.extend(match.group(1) for match in matches)
+            values.extend(tf_file.parameters.get((type_, parameter), ()))
 
         if len(values) == 0:
             raise NotFoundError(
@@ -678,30 +956,10 @@ class RegexTerraformModifier(Terraform):
         Returns:
             Updated Terraform configuration string
         """
-        # Find all module declarations using bracket counting
-        module_start_pattern = r'module\s+"([^"]+)"\s+\{'
-
-        for module_match in re.finditer(module_start_pattern, terraform_config):
-            start_pos = module_match.end() - 1  # Position of opening '{'
-
-            # Use bracket counting to find the matching closing brace
-            bracket_count = 0
-            end_pos = -1
-
-            for i in range(start_pos, len(terraform_config)):
-                if terraform_config[i] == "{":
-                    bracket_count += 1
-                elif terraform_config[i] == "}":
-                    bracket_count -= 1
-                    if bracket_count == 0:
-                        end_pos = i
-                        break
-
-            if end_pos == -1:
-                continue  # Couldn't find matching bracket
-
+        # Find all top-level module blocks
+        for block in _iter_module_blocks(terraform_config):
             # Extract the full module block
-            module_block = terraform_config[module_match.start() : end_pos + 1]
+            module_block = terraform_config[block.start : block.close_pos + 1]
 
             # Check if this is a Spring Boot service module
             if "spring-boot-service" not in module_block:
@@ -711,28 +969,15 @@ class RegexTerraformModifier(Terraform):
             updated_module = module_block
 
             # Remove docker_image line (including leading whitespace)
-            docker_image_pattern = r"^[ \t]*docker_image\s*=\s*[^\n]+\n"
-            updated_module = re.sub(
-                docker_image_pattern, "", updated_module, flags=re.MULTILINE
-            )
+            updated_module = _DOCKER_IMAGE_LINE_RE.sub("", updated_module)
 
             # Remove datadog_tags block (handles multi-line block with nested braces)
             # Use bracket counting for datadog_tags
-            datadog_match = re.search(r"datadog_tags\s*=\s*\{", updated_module)
+            datadog_match = _DATADOG_TAGS_RE.search(updated_module)
             if datadog_match:
                 datadog_start = datadog_match.start()
                 brace_start = datadog_match.end() - 1
-                bracket_count = 0
-                datadog_end = -1
-
-                for i in range(brace_start, len(updated_module)):
-                    if updated_module[i] == "{":
-                        bracket_count += 1
-                    elif updated_module[i] == "}":
-                        bracket_count -= 1
-                        if bracket_count == 0:
-                            datadog_end = i + 1
-                            break
+                datadog_end = _find_closing_bracket(updated_module, brace_start) + 1
 
                 if datadog_end > 0:
                     # Find the newline after the closing brace if it exists
@@ -742,9 +987,11 @@ class RegexTerraformModifier(Terraform):
                     ):
                         datadog_end += 1
                     # Remove the entire datadog_tags block including leading whitespace
-                    line_start = datadog_start
-                    while line_start > 0 and updated_module[line_start - 1] in " \t":
-                        line_start -= 1
+                    line_start = updated_module.rfind("\n", 0, datadog_start) + 1
+                    if updated_module[line_start:datadog_start].strip(" \t"):
+                        # Something else precedes it on the line, so only the
+                        # whitespace right before it is removed
+                        line_start = len(updated_module[:datadog_start].rstrip(" \t"))
                     updated_module = (
                         updated_module[:line_start] + updated_module[datadog_end:]
                     )
@@ -761,11 +1008,13 @@ class RegexTerraformModifier(Terraform):
                         + updated_module[last_brace:]
                     )
 
-            # Replace the old module block with the updated one
-            terraform_config = terraform_config.replace(module_block, updated_module)
-
-            # We only process the first Spring Boot module found
-            return terraform_config
+            # Splice the updated module in place of the old one. We only
+            # process the first Spring Boot module found
+            return (
+                terraform_config[: block.start]
+                + updated_module
+                + terraform_config[block.close_pos + 1 :]
+            )
 
         # No Spring Boot module found, return config unchanged
         return terraform_config
@@ -1,3 +1,4 @@
+import os
 import subprocess
 from typing import Self
 
@@ -7,8 +8,18 @@ from deployment_migration.application import VersionControl
 class GitVersionControl(VersionControl):
     """Implementation of VersionControl that interacts with Git."""
 
+    def __init__(self: Self) -> None:
+        # Origin URLs by working directory, so git is only asked once per repository
+        self._origins: dict[str, str] = {}
+
     def get_origin(self: Self) -> str:
         """Get the remote origin URL of the Git repository."""
+        working_directory = os.getcwd()
+        if working_directory not in self._origins:
+            self._origins[working_directory] = self._read_origin()
+        return self._origins[working_directory]
+
+    def _read_origin(self: Self) -> str:
         try:
             result = subprocess.run(
                 ["git", "config", "--get", "remote.origin.url"],
@@ -0,0 +1,96 @@
+import pytest
+
+from unittest import mock
+from deployment_migration.application import (
+    DeploymentMigration,
+    VersionControl,
+    FileHandler,
+    GithubActionsAuthor,
+    Terraform,
+    AWS,
+    ApplicationContext,
+    GithubApi,
+)
+
+
+# The collaborators are created once per session, as autospeccing a port
+# introspects the whole class. Calls are checked against the port signatures.
+# Test modules that share them opt in to reset_mocks, which clears them after
+# every test. Modules testing a real implementation override these by name.
+@pytest.fixture(scope="session")
+def version_control() -> VersionControl:
+    return mock.create_autospec(VersionControl, spec_set=True, instance=True)
+
+
+@pytest.fixture(scope="session")
+def file_handler() -> FileHandler:
+    return mock.create_autospec(FileHandler, spec_set=True, instance=True)
+
+
+@pytest.fixture(scope="session")
+def github_actions_author() -> GithubActionsAuthor:
+    return mock.create_autospec(GithubActionsAuthor, spec_set=True, instance=True)
+
+
+@pytest.fixture(scope="session")
+def terraform_modifier() -> Terraform:
+    return mock.create_autospec(Terraform, spec_set=True, instance=True)
+
+
+@pytest.fixture(scope="session")
+def parameter_store() -> AWS:
+    return mock.create_autospec(AWS, spec_set=True, instance=True)
+
+
+@pytest.fixture(scope="session")
+def github_api():
+    return mock.create_autospec(GithubApi, spec_set=True, instance=True)
+
+
+@pytest.fixture(scope="session")
+def application_context() -> ApplicationContext:
+    return mock.create_autospec(ApplicationContext, spec_set=True, instance=True)
+
+
+@pytest.fixture
+def reset_mocks(
+    version_control,
+    file_handler,
+    github_actions_author,
+    terraform_modifier,
+    parameter_store,
+    application_context,
+    github_api,
+):
+    yield
+    for collaborator in (
+        version_control,
+        file_handler,
+        github_actions_author,
+        terraform_modifier,
+        parameter_store,
+        application_context,
+        github_api,
+    ):
+        collaborator.reset_mock(return_value=True, side_effect=True)
+
+
+@pytest.fixture(scope="session")
+def application(
+    version_control,
+    file_handler,
+    github_actions_author,
+    terraform_modifier,
+    parameter_store,
+    application_context,
+    github_api,
+) -> DeploymentMigration:
+    return DeploymentMigration(
+        version_control=version_control,
+        file_handler=file_handler,
+        github_actions_author=github_actions_author,
+        terraform=terraform_modifier,
+        aws=parameter_store,
+        application_context=application_context,
+        github_api=github_api,
+    )
@@ -1,6 +1,5 @@
-import os
-import tempfile
 from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
 from typing import Self
 
 import pytest
@@ -8,81 +7,55 @@ import pytest
 from unittest import mock
 from deployment_migration.application import (
     DeploymentMigration,
-    VersionControl,
     FileHandler,
     GithubActionsAuthor,
     Terraform,
-    AWS,
-    ApplicationContext,
     ApplicationRuntimeTarget,
     ApplicationBuildTool,
-    GithubApi,
 )
 
-
-@pytest.fixture
-def version_control() -> VersionControl:
-    return mock.Mock(spec=VersionControl)
-
-
-@pytest.fixture
-def file_handler() -> FileHandler:
-    return mock.Mock(spec=FileHandler)
-
-
-@pytest.fixture
-def github_actions_author() -> GithubActionsAuthor:
-    return mock.Mock(spec=GithubActionsAuthor)
-
-
-@pytest.fixture
-def terraform_modifier() -> Terraform:
-    return mock.Mock(spec=Terraform)
-
-
-@pytest.fixture
-def parameter_store() -> AWS:
-    return mock.Mock(spec=AWS)
-
-
-@pytest.fixture
-def github_api():
-    return mock.Mock(spec=GithubApi)
-
-
-@pytest.fixture
-def application_context() -> ApplicationContext:
-    return mock.Mock(spec=ApplicationContext)
+# Paths the tests refer to over and over, built once at import
+_TERRAFORM_FOLDER = Path("terraform")
+_TEMPLATE_FOLDER = Path("terraform/template/")
+_TERRAFORM_MAIN_TF = Path("terraform/main.tf")
+_DEPLOYMENT_FOLDER = Path(".deployment")
+_CIRCLECI_CONFIG = Path(".circleci/config.yml")
+_DEPLOY_WORKFLOW = Path(".github/workflows/build-and-deploy.yml")
+_PULL_REQUEST_WORKFLOW = Path(".github/workflows/pull-request.yml")
+_PULL_REQUEST_COMMENT_WORKFLOW = Path(".github/workflows/pull-request-comment.yml")
+_GITIGNORE = Path(".gitignore")
+
+# Read-only find_module results shared by the provider upgrade and ECR tests
+_ACCOUNT_METADATA_MODULE = MappingProxyType(
+    {
+        "github.com/nsbno/terraform-aws-account-metadata": {
+            "name": "account_metadata",
+        },
+    }
+)
+_ECS_AND_ACCOUNT_METADATA_MODULES = MappingProxyType(
+    {
+        "github.com/nsbno/terraform-aws-ecs-service": {
+            "name": "ecs",
+            "file_path": Path("infrastructure/main.tf"),
+        },
+        **_ACCOUNT_METADATA_MODULE,
+    }
+)
 
 
-@pytest.fixture
-def application(
-    version_control,
-    file_handler,
-    github_actions_author,
-    terraform_modifier,
-    parameter_store,
-    application_context,
-    github_api,
-) -> DeploymentMigration:
-    return DeploymentMigration(
-        version_control=version_control,
-        file_handler=file_handler,
-        github_actions_author=github_actions_author,
-        terraform=terraform_modifier,
-        aws=parameter_store,
-        application_context=application_context,
-        github_api=github_api,
-    )
+# Every test shares the session-scoped mocks from conftest, cleared after each
+pytestmark = pytest.mark.usefixtures("reset_mocks")
 
 
 @pytest.mark.parametrize(
     "folder",
     [
-        Path("terraform/template/"),
+        _TEMPLATE_FOLDER,
         Path("terraform/modules/template/"),
         Path("infrastructure/"),
     ],
+    ids=str,
 )
 def test_can_find_infrastructure_folder(
     application: DeploymentMigration, file_handler: FileHandler, folder: Path
@@ -102,26 +75,27 @@ def test_fails_if_no_infrastructure_folder_is_found(
         application.find_terraform_infrastructure_folder()
 
 
+def _only_folder(expected: Path):
+    """side_effect for folder_exists that only finds the given folder."""
+    return lambda folder: folder == expected
+
+
 @pytest.mark.parametrize(
-    "folder_base",
+    "folder",
     [
-        Path("terraform/environment/"),
-        Path("environments/"),
+        pytest.param(base / environment_name, id=f"{base}-{environment_name}")
+        for base in (Path("terraform/environment/"), Path("environments/"))
+        for environment_name in ("service", "test", "staging", "production")
     ],
 )
-@pytest.mark.parametrize(
-    "environment_name", ["service", "test", "staging", "production"]
-)
 def test_can_find_environment_folder(
     application: DeploymentMigration,
     file_handler: FileHandler,
-    folder_base: Path,
-    environment_name: str,
+    folder: Path,
 ):
-    folder = folder_base / environment_name
-    file_handler.folder_exists.side_effect = lambda x: x == folder
+    file_handler.folder_exists.side_effect = _only_folder(folder)
 
-    assert application.find_terraform_environment_folder(environment_name) == folder
+    assert application.find_terraform_environment_folder(folder.name) == folder
 
 
 def test_fails_if_no_environment_folder_is_found(
@@ -139,9 +113,7 @@ def test_creates_and_writes_github_action_deployment_workflow(
     github_actions_author: GithubActionsAuthor,
 ) -> None:
     created_files = {}
-    file_handler.create_file.side_effect = lambda path, content: created_files.update(
-        {path: content}
-    )
+    file_handler.create_file.side_effect = created_files.__setitem__
     file_handler.read_file.return_value = "workflows: {}"
 
     expected_deployment_file = "Never gonna give you up, never gonna let you down"
@@ -166,12 +138,12 @@ def test_creates_and_writes_github_action_deployment_workflow(
         application_name="test-app",
         application_build_tool=ApplicationBuildTool.PYTHON,
         application_runtime_target=ApplicationRuntimeTarget.LAMBDA,
-        terraform_base_folder=Path("terraform"),
+        terraform_base_folder=_TERRAFORM_FOLDER,
     )
 
     assert created_files == {
-        Path(".github/workflows/build-and-deploy.yml"): expected_deployment_file,
-        Path(".github/workflows/pull-request.yml"): expected_pull_request_file,
+        _DEPLOY_WORKFLOW: expected_deployment_file,
+        _PULL_REQUEST_WORKFLOW: expected_pull_request_file,
         Path(
             ".github/workflows/pull-request-comment.yml"
         ): expected_pull_request_comment_file,
@@ -189,20 +161,18 @@ def test_upgrades_aws_repo_terraform_resources(
     )
     # Mock find_module to return None (module doesn't exist yet)
     terraform_modifier.find_module.return_value = None
+    terraform_modifier.has_module.return_value = False
 
     terraform_config = "We are no strangers to love\nYou know the rules and so do I\n"
 
     file_handler.read_file.return_value = terraform_config
 
-    written_file = {}
-    file_handler.overwrite_file.side_effect = lambda path, content: written_file.update(
-        {path: terraform_config + expected_file}
-    )
-
     application.upgrade_aws_repo_terraform_resources(terraform_folder="terraform")
 
-    file_to_modify = Path("terraform/main.tf")
-    assert written_file == {file_to_modify: terraform_config + expected_file}
+    file_to_modify = _TERRAFORM_MAIN_TF
+    file_handler.overwrite_file.assert_called_once_with(
+        file_to_modify, terraform_config + expected_file
+    )
 
 
 def test_updates_and_writes_terraform_application_resources(
@@ -213,12 +183,12 @@ def test_updates_and_writes_terraform_application_resources(
     found_module = {
         "github.com/nsbno/terraform-aws-ecs-service": {
             "name": "ecs",
-            "file_path": Path("terraform/main.tf"),
+            "file_path": _TERRAFORM_MAIN_TF,
         },
         "github.com/nsbno/terraform-aws-lambda": None,
         "github.com/nsbno/terraform-aws-account-metadata": {
             "name": "account_metadata",
-            "file_path": Path("terraform/main.tf"),
+            "file_path": _TERRAFORM_MAIN_TF,
         },
         "github.com/nsbno/terraform-digitalekanaler-modules//spring-boot-service": None,
     }
@@ -229,24 +199,23 @@ def test_updates_and_writes_terraform_application_resources(
     terraform_modifier.has_module.return_value = False  # No ECS or Spring Boot module
 
     expected_file = "Never gonna give you up, never gonna let you down"
-    terraform_modifier.add_module.side_effect = (
+    terraform_modifier.update_module_versions.side_effect = (
         lambda config, *args, **kwargs: config + expected_file
     )
 
     terraform_config = "We are no strangers to love\nYou know the rules and so do I\n"
     file_handler.read_file.return_value = terraform_config
 
-    written_file = {}
-    file_handler.overwrite_file.side_effect = lambda path, content: written_file.update(
-        {path: terraform_config + expected_file}
-    )
-
     application.upgrade_terraform_application_resources(
         terraform_infrastructure_folder="terraform",
     )
 
-    file_to_modify = Path("terraform/main.tf")
-    assert written_file == {file_to_modify: terraform_config + expected_file}
+    # Both found modules live in main.tf, which is written once per module
+    file_to_modify = _TERRAFORM_MAIN_TF
+    assert file_handler.overwrite_file.call_args_list == [
+        mock.call(file_to_modify, terraform_config + expected_file),
+        mock.call(file_to_modify, terraform_config + expected_file),
+    ]
 
 
 def test_update_terraform_application_resources_updates_module_versions(
@@ -256,12 +225,12 @@ def test_update_terraform_application_resources_updates_module_versions(
     found_module = {
         "github.com/nsbno/terraform-aws-ecs-service": {
             "name": "ecs",
-            "file_path": Path("terraform/main.tf"),
+            "file_path": _TERRAFORM_MAIN_TF,
         },
         "github.com/nsbno/terraform-aws-lambda": None,
         "github.com/nsbno/terraform-aws-account-metadata": {
             "name": "account_metadata",
-            "file_path": Path("terraform/main.tf"),
+            "file_path": _TERRAFORM_MAIN_TF,
         },
         "github.com/nsbno/terraform-digitalekanaler-modules//spring-boot-service": None,
     }
@@ -294,160 +263,106 @@ def test_update_terraform_application_resources_updates_module_versions(
     }
 
 
-class TestAWSProviderUpgrade:
-    @pytest.fixture(autouse=True)
-    def file_handler_data(self: Self, file_handler: FileHandler) -> dict[str, str]:
-        files = {
-            "infrastructure/versions.tf": "infrastructure_file",
-            "environments/test/versions.tf": "test_file",
-            "environments/prod/versions.tf": "prod_file",
-            "infrastructure/main.tf": "not relevant",
-        }
-        file_handler.read_file.side_effect = lambda path: files[str(path)]
+# Provider files of an application repo, keyed by path, and where find_provider
+# reports the AWS provider for each folder. main.tf holds no provider block.
+_PROVIDER_FILES = MappingProxyType(
+    {
+        "infrastructure/versions.tf": "infrastructure_file",
+        "environments/test/versions.tf": "test_file",
+        "environments/prod/versions.tf": "prod_file",
+        "infrastructure/main.tf": "not relevant",
+    }
+)
+_PROVIDER_SPEC = MappingProxyType(
+    {
+        file_path.rsplit("/", 1)[0]: {"aws": {"file": file_path}}
+        for file_path in _PROVIDER_FILES
+        if "main.tf" not in file_path
+    }
+)
 
-        return files
 
-    @pytest.fixture(autouse=True)
-    def provider_locations(
-        self: Self,
+class TestAWSProviderUpgrade:
+    # The upgrade is run once per folder and every test asserts on the recorded
+    # calls. The mocks are wired here too, as they are reset after every test.
+    @pytest.fixture(scope="class", params=list(_PROVIDER_SPEC))
+    @classmethod
+    def upgrade_result(
+        cls: type[Self],
+        request: pytest.FixtureRequest,
+        application: DeploymentMigration,
         terraform_modifier: Terraform,
-        file_handler_data: dict[str, str],
-    ) -> dict[str, str]:
-        found_provider_spec = {
-            f"{file_path.rsplit('/',1)[0]}": {
-                "aws": {"file": file_path},
-            }
-            for file_path in file_handler_data.keys()
-            if "main.tf" not in file_path
-        }
+        file_handler: FileHandler,
+    ) -> SimpleNamespace:
+        file_handler.read_file.side_effect = lambda path: _PROVIDER_FILES[str(path)]
         terraform_modifier.find_provider.side_effect = (
-            lambda provider, folder, *_, **__: (
-                found_provider_spec[str(folder)][provider]
-            )
+            lambda provider, folder, *_, **__: _PROVIDER_SPEC[str(folder)][provider]
         )
-
-    @pytest.fixture(autouse=True)
-    def account_metadata_data(self: Self, terraform_modifier: Terraform) -> None:
-        found_module = {
-            "github.com/nsbno/terraform-aws-account-metadata": {
-                "name": "account_metadata",
-            },
-        }
         terraform_modifier.find_module.side_effect = lambda module, *_, **__: (
-            found_module[module]
+            _ACCOUNT_METADATA_MODULE[module]
         )
 
-    def test_updates_aws_provider_version_in_application(
-        self: Self,
-        application: DeploymentMigration,
-        terraform_modifier: Terraform,
-    ):
         application.upgrade_application_repo_terraform_provider_versions(
-            folders=[
-                "infrastructure",
-                "environments/prod",
-                "environments/test",
-            ]
+            folders=[request.param]
         )
 
-        for call in terraform_modifier.update_provider_versions.mock_calls:
-            assert call.kwargs["target_providers"] == {"aws": ">= 6.15.0, < 7.0.0"}
+        # Copy the calls out, as the mocks are reset after every test
+        return SimpleNamespace(
+            provider_file=_PROVIDER_SPEC[request.param]["aws"]["file"],
+            provider_updates=list(
+                terraform_modifier.update_provider_versions.mock_calls
+            ),
+            writes=list(file_handler.overwrite_file.mock_calls),
+        )
 
-    def test_uses_correct_provider_file_for_provider_upgrade(
+    def test_updates_aws_provider_version_in_application(
         self: Self,
-        application: DeploymentMigration,
-        terraform_modifier: Terraform,
-        file_handler_data: dict[str, str],
+        upgrade_result: SimpleNamespace,
     ):
-        application.upgrade_application_repo_terraform_provider_versions(
-            folders=[
-                "infrastructure",
-                "environments/prod",
-                "environments/test",
-            ]
-        )
+        (call,) = upgrade_result.provider_updates
+        assert call.kwargs["target_providers"] == {"aws": ">= 6.15.0, < 7.0.0"}
 
-        calls = terraform_modifier.update_provider_versions.mock_calls
-        call_content = [call.args[0] for call in calls]
+    def test_uses_correct_provider_file_for_provider_upgrade(
+        self: Self,
+        upgrade_result: SimpleNamespace,
+    ):
+        call_content = [call.args[0] for call in upgrade_result.provider_updates]
 
-        for file, content in file_handler_data.items():
-            if "main.tf" in file:
-                continue
-            assert content in call_content
+        assert call_content == [_PROVIDER_FILES[upgrade_result.provider_file]]
 
     def test_updates_aws_provider_writes_file_back_to_filesystem(
         self: Self,
-        application: DeploymentMigration,
-        terraform_modifier: Terraform,
-        file_handler: FileHandler,
-        file_handler_data,
+        upgrade_result: SimpleNamespace,
     ):
-        application.upgrade_application_repo_terraform_provider_versions(
-            folders=[
-                "infrastructure",
-                "environments/prod",
-                "environments/test",
-            ]
-        )
+        files_written = [call.args[0] for call in upgrade_result.writes]
 
-        files_written = [
-            call.args[0] for call in file_handler.overwrite_file.mock_calls
-        ]
-        expected_files = [
-            file_name for file_name in file_handler_data if "main.tf" not in file_name
-        ]
-
-        assert set(files_written) == set(expected_files)
+        assert files_written == [upgrade_result.provider_file]
 
 
 class TestAddECRRepository:
-    @pytest.fixture(autouse=True)
-    def terraform_infra_folder(
-        self: Self,
-        file_handler: FileHandler,
-    ):
-        file_handler.folder_exists.return_value = True
-
-        return Path("infrastructure")
+    GITHUB_REPOSITORY_NAME = "test-app"
+    ECR_REPOSITORY_NAME = "petstore-repo"
 
     @pytest.fixture(autouse=True)
-    def always_find_aws_account_metadata_module(
+    def infrastructure_with_ecs_service(
         self: Self,
+        file_handler: FileHandler,
         terraform_modifier: Terraform,
     ):
-        found_module = {
-            "github.com/nsbno/terraform-aws-ecs-service": {
-                "name": "ecs",
-                "file_path": Path("infrastructure/main.tf"),
-            },
-            "github.com/nsbno/terraform-aws-account-metadata": {
-                "name": "account_metadata",
-            },
-        }
-
+        file_handler.folder_exists.return_value = True
         terraform_modifier.find_module.side_effect = lambda module, *_, **__: (
-            found_module.get(module)
+            _ECS_AND_ACCOUNT_METADATA_MODULES.get(module)
         )
 
-    @pytest.fixture
-    def github_repository_name(self: Self) -> str:
-        return "test-app"
-
-    @pytest.fixture
-    def ecr_repository_name(self: Self) -> str:
-        return "petstore-repo"
-
     def test_vy_ecs_image_source_is_added_when_not_present(
         self: Self,
         application: DeploymentMigration,
         terraform_modifier: Terraform,
-        github_repository_name: str,
-        ecr_repository_name: str,
     ):
         application.replace_image_with_vy_ecs_image(
             terraform_infrastructure_folder="infrastructure",
-            github_repository_name=github_repository_name,
-            ecr_repository_name=ecr_repository_name,
+            github_repository_name=self.GITHUB_REPOSITORY_NAME,
+            ecr_repository_name=self.ECR_REPOSITORY_NAME,
         )
 
         call = terraform_modifier.add_data_source.mock_calls[0]
@@ -455,19 +370,17 @@ class TestAddECRRepository:
         assert call.args[1] == "vy_ecs_image"
         assert call.kwargs["name"] == "this"
         assert call.kwargs["variables"] == {
-            "github_repository_name": github_repository_name,
-            "ecr_repository_name": ecr_repository_name,
+            "github_repository_name": self.GITHUB_REPOSITORY_NAME,
+            "ecr_repository_name": self.ECR_REPOSITORY_NAME,
         }
 
     def test_removes_vydev_artifact_reference(
         self: Self,
         application: DeploymentMigration,
         terraform_modifier: Terraform,
-        github_repository_name: str,
-        ecr_repository_name: str,
     ):
         application.replace_image_with_vy_ecs_image(
-            "infrastructure", github_repository_name, ecr_repository_name
+            "infrastructure", self.GITHUB_REPOSITORY_NAME, self.ECR_REPOSITORY_NAME
         )
 
         assert terraform_modifier.remove_vydev_artifact_reference.call_count == 1
@@ -476,11 +389,9 @@ class TestAddECRRepository:
         self: Self,
         application: DeploymentMigration,
         terraform_modifier: Terraform,
-        github_repository_name: str,
-        ecr_repository_name: str,
     ):
         application.replace_image_with_vy_ecs_image(
-            "infrastructure", github_repository_name, ecr_repository_name
+            "infrastructure", self.GITHUB_REPOSITORY_NAME, self.ECR_REPOSITORY_NAME
         )
 
         assert terraform_modifier.replace_image_tag_on_ecs_module.call_count == 1
@@ -500,18 +411,15 @@ def test_only_finds_environment_folders_in_terraform_infrastructure_folder(
         [],
     ]
 
-    # Create a tempfile
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Store the current directory and CD into this temp dir
-        current_dir = os.getcwd()
-        os.chdir(temp_dir)
-
-        os.mkdir("terraform")
-
+    # Only the terraform/ folder exists, without touching the real filesystem
+    with mock.patch.object(
+        Path,
+        "exists",
+        autospec=True,
+        side_effect=lambda path: path == _TERRAFORM_FOLDER,
+    ):
         result = application.find_all_environment_folders()
 
-        os.chdir(current_dir)
-
     assert result == [Path("prod"), Path("staging"), Path("test")]
 
 
@@ -549,7 +457,7 @@ def test_remove_old_deployment_setup(
 
     # Verify that .deployment folder is deleted
     file_handler.delete_folder.assert_called_once_with(
-        Path(".deployment"), not_found_ok=True
+        _DEPLOYMENT_FOLDER, not_found_ok=True
     )
 
     # Verify that terraform lock files are found and deleted
@@ -559,12 +467,14 @@ def test_remove_old_deployment_setup(
 
     # Verify each lock file is deleted
     assert file_handler.delete_file.call_count == len(mock_lock_files)
-    for lock_file in mock_lock_files:
-        file_handler.delete_file.assert_any_call(lock_file, not_found_ok=True)
+    file_handler.delete_file.assert_has_calls(
+        [mock.call(lock_file, not_found_ok=True) for lock_file in mock_lock_files],
+        any_order=True,
+    )
 
     # Verify that .circleci/config.yml is overwritten with no-op config
     file_handler.overwrite_file.assert_called_once_with(
-        Path(".circleci/config.yml"), expected_circleci_config
+        _CIRCLECI_CONFIG, expected_circleci_config
     )
 
 
@@ -597,7 +507,7 @@ def test_remove_old_deployment_setup_handles_no_lock_files(
 
     # Verify that .deployment folder is deleted
     file_handler.delete_folder.assert_called_once_with(
-        Path(".deployment"), not_found_ok=True
+        _DEPLOYMENT_FOLDER, not_found_ok=True
     )
 
     # Verify that terraform lock files search was performed
@@ -610,7 +520,7 @@ def test_remove_old_deployment_setup_handles_no_lock_files(
 
     # Verify that .circleci/config.yml is overwritten with no-op config
     file_handler.overwrite_file.assert_called_once_with(
-        Path(".circleci/config.yml"), expected_circleci_config
+        _CIRCLECI_CONFIG, expected_circleci_config
     )
 
 
@@ -630,7 +540,7 @@ def test_remove_old_deployment_setup_handles_missing_circleci_config(
 
     # Verify that .deployment folder is deleted
     file_handler.delete_folder.assert_called_once_with(
-        Path(".deployment"), not_found_ok=True
+        _DEPLOYMENT_FOLDER, not_found_ok=True
     )
 
     # Verify that file_exists was called to check for .circleci/config.yml
@@ -657,7 +567,7 @@ def test_find_openapi_spec_returns_path_when_circleci_config_exists_with_spec(
     result = application._find_openapi_spec()
 
     assert result == Path("src/main/resources/openapi.yaml")
-    file_handler.read_file.assert_called_once_with(Path(".circleci/config.yml"))
+    file_handler.read_file.assert_called_once_with(_CIRCLECI_CONFIG)
 
 
 def test_find_open_api_spec_handles_other_non_workflow_jobs(
@@ -678,7 +588,7 @@ def test_find_open_api_spec_handles_other_non_workflow_jobs(
     result = application._find_openapi_spec()
 
     assert result == Path("src/main/resources/openapi.yaml")
-    file_handler.read_file.assert_called_once_with(Path(".circleci/config.yml"))
+    file_handler.read_file.assert_called_once_with(_CIRCLECI_CONFIG)
 
 
 def test_find_openapi_spec_returns_none_when_circleci_config_exists_without_spec(
@@ -694,7 +604,7 @@ def test_find_openapi_spec_returns_none_when_circleci_config_exists_without_spec
     result = application._find_openapi_spec()
 
     assert result is None
-    file_handler.read_file.assert_called_once_with(Path(".circleci/config.yml"))
+    file_handler.read_file.assert_called_once_with(_CIRCLECI_CONFIG)
 
 
 def test_find_openapi_spec_returns_none_when_circleci_folder_does_not_exist(
@@ -713,7 +623,7 @@ def test_find_openapi_spec_returns_none_when_circleci_folder_does_not_exist(
     result = application._find_openapi_spec()
 
     assert result is None
-    file_handler.read_file.assert_called_once_with(Path(".circleci/config.yml"))
+    file_handler.read_file.assert_called_once_with(_CIRCLECI_CONFIG)
 
 
 def test_upgrade_terraform_application_resources_with_ecs_in_separate_file(
@@ -749,13 +659,13 @@ def test_upgrade_terraform_application_resources_with_ecs_in_separate_file(
         service_tf_content.replace("2.0.0", "3.0.0")
     )
 
-    written_files = {}
-    file_handler.overwrite_file.side_effect = lambda path, content: (
-        written_files.update({str(path): content})
-    )
-
     application.upgrade_terraform_application_resources("terraform/template")
 
+    written_files = {
+        str(call.args[0]): call.args[1]
+        for call in file_handler.overwrite_file.call_args_list
+    }
+
     # Should write to service.tf, NOT main.tf
     assert "terraform/template/service.tf" in written_files
     assert "3.0.0" in written_files["terraform/template/service.tf"]
@@ -794,15 +704,15 @@ def test_replace_image_with_ecr_when_ecs_in_separate_file(
         "}\n"
     )
 
-    written_files = {}
-    file_handler.overwrite_file.side_effect = lambda path, content: (
-        written_files.update({str(path): content})
-    )
-
     application.replace_image_with_vy_ecs_image(
         "terraform/template", "my-repo", "123456789"
     )
 
+    written_files = {
+        str(call.args[0]): call.args[1]
+        for call in file_handler.overwrite_file.call_args_list
+    }
+
     # Should write to ecs.tf, NOT main.tf
     assert "terraform/template/ecs.tf" in written_files
     assert "repository_url" in written_files["terraform/template/ecs.tf"]
@@ -877,13 +787,13 @@ def test_upgrade_aws_repo_when_oidc_module_in_separate_file(
         "0.0.1", "0.1.0"
     )
 
-    written_files = {}
-    file_handler.overwrite_file.side_effect = lambda path, content: (
-        written_files.update({str(path): content})
-    )
-
     application.upgrade_aws_repo_terraform_resources("terraform/service")
 
+    written_files = {
+        str(call.args[0]): call.args[1]
+        for call in file_handler.overwrite_file.call_args_list
+    }
+
     # Should write to github.tf, NOT main.tf
     assert "terraform/service/github.tf" in written_files
     assert "0.1.0" in written_files["terraform/service/github.tf"]
@@ -1059,7 +969,7 @@ class TestServiceEnvironmentDetection:
             application_name="my-app",
             application_build_tool=ApplicationBuildTool.PYTHON,
             application_runtime_target=ApplicationRuntimeTarget.ECS,
-            terraform_base_folder=Path("terraform"),
+            terraform_base_folder=_TERRAFORM_FOLDER,
         )
 
         # Verify the workflow generator was called without skip flag (or False)
@@ -1092,7 +1002,7 @@ class TestServiceEnvironmentDetection:
             application_name="my-app",
             application_build_tool=ApplicationBuildTool.PYTHON,
             application_runtime_target=ApplicationRuntimeTarget.ECS,
-            terraform_base_folder=Path("terraform"),
+            terraform_base_folder=_TERRAFORM_FOLDER,
         )
 
         # Verify PR workflow generator was called with skip flag
@@ -1207,7 +1117,7 @@ class TestWorkflowGenerationWithCustomAWSRole:
             application_name="brudd-backend",
             application_build_tool=ApplicationBuildTool.PYTHON,
             application_runtime_target=ApplicationRuntimeTarget.ECS,
-            terraform_base_folder=Path("terraform"),
+            terraform_base_folder=_TERRAFORM_FOLDER,
         )
 
         # Verify the workflow generator was called with aws_role_name
@@ -1234,7 +1144,7 @@ class TestWorkflowGenerationWithCustomAWSRole:
             application_name="booking",
             application_build_tool=ApplicationBuildTool.PYTHON,
             application_runtime_target=ApplicationRuntimeTarget.ECS,
-            terraform_base_folder=Path("terraform"),
+            terraform_base_folder=_TERRAFORM_FOLDER,
         )
 
         # Verify the workflow generator was called with None or no aws_role_name
@@ -1261,7 +1171,7 @@ class TestWorkflowGenerationWithCustomAWSRole:
             application_name="drifts-api",
             application_build_tool=ApplicationBuildTool.PYTHON,
             application_runtime_target=ApplicationRuntimeTarget.ECS,
-            terraform_base_folder=Path("terraform"),
+            terraform_base_folder=_TERRAFORM_FOLDER,
         )
 
         # Verify PR workflow generator was called with aws_role_name
@@ -1279,9 +1189,7 @@ def test_generate_pr_workflows_creates_only_pr_files(
 ) -> None:
     """PR workflow generation should create only 2 files, not 3."""
     created_files = {}
-    file_handler.create_file.side_effect = lambda path, content: (
-        created_files.update({path: content})
-    )
+    file_handler.create_file.side_effect = created_files.__setitem__
     file_handler.read_file.side_effect = FileNotFoundError()  # No .circleci
 
     github_actions_author.create_pull_request_workflow.return_value = "pr workflow"
@@ -1293,13 +1201,13 @@ def test_generate_pr_workflows_creates_only_pr_files(
         repository_name="test-app",
         application_build_tool=ApplicationBuildTool.PYTHON,
         application_runtime_target=ApplicationRuntimeTarget.ECS,
-        terraform_base_folder=Path("terraform"),
+        terraform_base_folder=_TERRAFORM_FOLDER,
     )
 
     # Only PR workflows created
-    assert Path(".github/workflows/pull-request.yml") in created_files
-    assert Path(".github/workflows/pull-request-comment.yml") in created_files
-    assert Path(".github/workflows/build-and-deploy.yml") not in created_files
+    assert _PULL_REQUEST_WORKFLOW in created_files
+    assert _PULL_REQUEST_COMMENT_WORKFLOW in created_files
+    assert _DEPLOY_WORKFLOW not in created_files
 
     # Deployment workflow method not called
     github_actions_author.create_deployment_workflow.assert_not_called()
@@ -1312,9 +1220,7 @@ def test_generate_deployment_workflow_creates_only_deployment_file(
 ) -> None:
     """Deployment workflow generation should create only 1 file."""
     created_files = {}
-    file_handler.create_file.side_effect = lambda path, content: (
-        created_files.update({path: content})
-    )
+    file_handler.create_file.side_effect = created_files.__setitem__
     file_handler.read_file.side_effect = FileNotFoundError()  # No .circleci
 
     github_actions_author.create_deployment_workflow.return_value = (
@@ -1326,13 +1232,13 @@ def test_generate_deployment_workflow_creates_only_deployment_file(
         application_name="test-app",
         application_build_tool=ApplicationBuildTool.PYTHON,
         application_runtime_target=ApplicationRuntimeTarget.ECS,
-        terraform_base_folder=Path("terraform"),
+        terraform_base_folder=_TERRAFORM_FOLDER,
     )
 
     # Only deployment workflow created
-    assert Path(".github/workflows/build-and-deploy.yml") in created_files
-    assert Path(".github/workflows/pull-request.yml") not in created_files
-    assert Path(".github/workflows/pull-request-comment.yml") not in created_files
+    assert _DEPLOY_WORKFLOW in created_files
+    assert _PULL_REQUEST_WORKFLOW not in created_files
+    assert _PULL_REQUEST_COMMENT_WORKFLOW not in created_files
 
     # PR workflow methods not called
     github_actions_author.create_pull_request_workflow.assert_not_called()
@@ -1348,7 +1254,7 @@ def test_ensure_cache_in_gitignore_creates_gitignore_if_not_exists(
     application.ensure_cache_in_gitignore()
 
     file_handler.create_file.assert_called_once_with(
-        Path(".gitignore"), ".vydev-cli-cache.json\n"
+        _GITIGNORE, ".vydev-cli-cache.json\n"
     )
 
 
@@ -1363,9 +1269,7 @@ def test_ensure_cache_in_gitignore_adds_entry_to_existing_gitignore(
     application.ensure_cache_in_gitignore()
 
     expected_content = existing_content + ".vydev-cli-cache.json\n"
-    file_handler.overwrite_file.assert_called_once_with(
-        Path(".gitignore"), expected_content
-    )
+    file_handler.overwrite_file.assert_called_once_with(_GITIGNORE, expected_content)
 
 
 def test_ensure_cache_in_gitignore_does_not_duplicate_entry(
@@ -1394,9 +1298,7 @@ def test_ensure_cache_in_gitignore_handles_missing_trailing_newline(
     application.ensure_cache_in_gitignore()
 
     expected_content = "*.pyc\n__pycache__/\n.vydev-cli-cache.json\n"
-    file_handler.overwrite_file.assert_called_once_with(
-        Path(".gitignore"), expected_content
-    )
+    file_handler.overwrite_file.assert_called_once_with(_GITIGNORE, expected_content)
 
 
 class TestSpringBootModuleRC3Upgrade:
@@ -1417,7 +1319,7 @@ class TestSpringBootModuleRC3Upgrade:
             "github.com/nsbno/terraform-aws-lambda": None,
             spring_boot_module: {
                 "name": "spring_boot_service",
-                "file_path": Path("terraform/main.tf"),
+                "file_path": _TERRAFORM_MAIN_TF,
             },
             "github.com/nsbno/terraform-aws-account-metadata": None,
         }
@@ -1480,7 +1382,7 @@ class TestSpringBootModuleRC3Upgrade:
             "github.com/nsbno/terraform-aws-lambda": None,
             spring_boot_module: {
                 "name": "spring_boot_service",
-                "file_path": Path("terraform/main.tf"),
+                "file_path": _TERRAFORM_MAIN_TF,
             },
             "github.com/nsbno/terraform-aws-account-metadata": None,
         }
@@ -1526,7 +1428,7 @@ class TestSpringBootModuleRC3Upgrade:
             "github.com/nsbno/terraform-aws-lambda": None,
             spring_boot_module: {
                 "name": "spring_boot_service",
-                "file_path": Path("terraform/main.tf"),
+                "file_path": _TERRAFORM_MAIN_TF,
             },
             "github.com/nsbno/terraform-aws-account-metadata": None,
         }
@@ -1575,7 +1477,7 @@ class TestSpringBootModuleRC3Upgrade:
             "github.com/nsbno/terraform-aws-lambda": None,
             spring_boot_module: {
                 "name": "spring_boot_service",
-                "file_path": Path("terraform/main.tf"),
+                "file_path": _TERRAFORM_MAIN_TF,
             },
             "github.com/nsbno/terraform-aws-account-metadata": None,
         }
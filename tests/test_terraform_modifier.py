@@ -1,8 +1,10 @@
+import os
+import time
 from pathlib import Path
 
 import pytest
 
-from deployment_migration.application import Terraform
+from deployment_migration.application import Terraform, NotFoundError
 from deployment_migration.infrastructure.terraform_modifier import (
     RegexTerraformModifier,
 )
@@ -85,6 +87,59 @@ def test_update_module_versions_handles_multiple_modules(
     assert 'source = "https://github.com/example/module2"' not in result
 
 
+def test_update_module_versions_handles_nested_blocks_before_source(
+    terraform_modifier: RegexTerraformModifier,
+):
+    """Test that update_module_versions finds the source after a nested block."""
+    # Arrange
+    terraform_config = """
+    module "example" {
+      tags = {
+        Name = "example"
+      }
+      source = "https://github.com/example/module?ref=1.0.0"
+    }
+
+    # module "commented" { source = "https://github.com/example/module" }
+    """
+
+    target_modules = {"https://github.com/example/module": "2.0.0"}
+
+    # Act
+    result = terraform_modifier.update_module_versions(terraform_config, target_modules)
+
+    # Assert
+    assert 'source = "https://github.com/example/module?ref=2.0.0"' in result
+    assert 'Name = "example"' in result
+    assert '# module "commented" { source = "https://github.com/example/module" }' in (
+        result
+    )
+
+
+def test_update_module_versions_ignores_a_commented_out_source(
+    terraform_modifier: RegexTerraformModifier,
+):
+    """Test that update_module_versions rewrites the real source, not a commented one."""
+    # Arrange
+    terraform_config = """
+    module "ecs_service" {
+      # source = "github.com/nsbno/terraform-aws-ecs-service"
+      source = "github.com/nsbno/terraform-aws-ecs-service?ref=2.0.0"
+    }
+    """
+
+    target_modules = {"github.com/nsbno/terraform-aws-ecs-service": "3.0.0"}
+
+    # Act
+    result = terraform_modifier.update_module_versions(terraform_config, target_modules)
+
+    # Assert
+    assert '# source = "github.com/nsbno/terraform-aws-ecs-service"\n' in result
+    assert (
+        '  source = "github.com/nsbno/terraform-aws-ecs-service?ref=3.0.0"' in result
+    )
+
+
 def test_add_module_creates_module_block(terraform_modifier: RegexTerraformModifier):
     """Test that add_module creates a module block with the specified parameters."""
     terraform_config = """
@@ -113,6 +168,31 @@ def test_add_module_creates_module_block(terraform_modifier: RegexTerraformModif
     assert "var3 = true" in result
 
 
+def test_add_module_does_not_quote_references(
+    terraform_modifier: RegexTerraformModifier,
+):
+    """Test that add_module leaves Terraform references unquoted."""
+    result = terraform_modifier.add_module(
+        terraform_config="",
+        name="new_module",
+        source="https://github.com/example/module",
+        version="1.0.0",
+        variables={
+            "from_module": "module.metadata.name",
+            "from_var": "var.name",
+            "from_local": "local.name",
+            "from_data": "data.aws_region.current.name",
+            "plain": "value",
+        },
+    )
+
+    assert "from_module = module.metadata.name" in result
+    assert "from_var = var.name" in result
+    assert "from_local = local.name" in result
+    assert "from_data = data.aws_region.current.name" in result
+    assert 'plain = "value"' in result
+
+
 def test_add_module_without_version(terraform_modifier: RegexTerraformModifier):
     """Test that add_module works correctly without a version."""
     # Arrange
@@ -217,6 +297,44 @@ def test_has_module_finds_module_with_version(
     assert result is True
 
 
+@pytest.mark.parametrize(
+    "shadowing_line",
+    [
+        '# source = "../../terraform-aws-ecs-service"',
+        'settings = { source = "other" }',
+    ],
+    ids=["commented-out", "nested"],
+)
+def test_has_module_ignores_sources_that_are_not_the_module_source(
+    terraform_modifier: RegexTerraformModifier, tmp_path, shadowing_line: str
+):
+    """Test that a commented-out or nested source does not hide the module's own source."""
+    # Arrange
+    terraform_config = f"""
+    module "ecs_service" {{
+      {shadowing_line}
+      source = "github.com/nsbno/terraform-aws-ecs-service?ref=2.0.0"
+    }}
+    """
+    (tmp_path / "main.tf").write_text(terraform_config)
+
+    # Act
+    has_module = terraform_modifier.has_module(
+        "github.com/nsbno/terraform-aws-ecs-service", tmp_path
+    )
+    found_module = terraform_modifier.find_module(
+        "github.com/nsbno/terraform-aws-ecs-service", tmp_path
+    )
+
+    # Assert
+    assert has_module is True
+    assert found_module is not None
+    assert found_module["version"] == "2.0.0"
+    assert "force_new_deployment = true" in (
+        terraform_modifier.add_force_new_deployment_to_ecs_module(terraform_config)
+    )
+
+
 def test_has_module_returns_false_when_module_not_found(
     terraform_modifier: RegexTerraformModifier, tmp_path
 ):
@@ -275,6 +393,64 @@ def test_find_module_returns_module_details(
     assert result["file_path"] == tf_file
 
 
+def test_find_module_extracts_reference_variables(
+    terraform_modifier: RegexTerraformModifier, tmp_path
+):
+    """Test that find_module keeps references whole and ignores trailing comments."""
+    # Arrange
+    terraform_config = """
+    module "example_module" {
+      source      = "https://github.com/example/module?ref=1.0.0"
+      environment = var.environment # the current environment
+      name        = "my-app" # the application name
+      vpc_id      = module.metadata.vpc.id
+    }
+    """
+    (tmp_path / "main.tf").write_text(terraform_config)
+
+    # Act
+    result = terraform_modifier.find_module(
+        "https://github.com/example/module", tmp_path
+    )
+
+    # Assert
+    assert result is not None
+    assert result["variables"] == {
+        "environment": "var.environment",
+        "name": "my-app",
+        "vpc_id": "module.metadata.vpc.id",
+    }
+
+
+def test_find_module_ignores_braces_inside_strings_and_comments(
+    terraform_modifier: RegexTerraformModifier, tmp_path
+):
+    """Test that braces in values and comments do not hide the attributes after them."""
+    # Arrange
+    terraform_config = """
+    module "example_module" {
+      source = "https://github.com/example/module?ref=1.0.0"
+      prefix = "prefix-{" # opens a { in a comment
+      suffix = "]-suffix"
+      name   = "my-app"
+    }
+    """
+    (tmp_path / "main.tf").write_text(terraform_config)
+
+    # Act
+    result = terraform_modifier.find_module(
+        "https://github.com/example/module", tmp_path
+    )
+
+    # Assert
+    assert result is not None
+    assert result["variables"] == {
+        "prefix": "prefix-{",
+        "suffix": "]-suffix",
+        "name": "my-app",
+    }
+
+
 def test_find_module_returns_none_when_module_not_found(
     terraform_modifier: RegexTerraformModifier, tmp_path
 ):
@@ -299,6 +475,30 @@ def test_find_module_returns_none_when_module_not_found(
     assert result is None
 
 
+def test_find_module_ignores_modules_downloaded_by_terraform_init(
+    terraform_modifier: RegexTerraformModifier, tmp_path
+):
+    """Test that find_module does not look inside the .terraform working directory."""
+    # Arrange
+    terraform_config = """
+    module "example" {
+      source = "https://github.com/example/module"
+    }
+    """
+
+    downloaded_module = tmp_path / ".terraform" / "modules" / "service"
+    downloaded_module.mkdir(parents=True)
+    (downloaded_module / "main.tf").write_text(terraform_config)
+
+    module_source = "https://github.com/example/module"
+
+    # Act
+    result = terraform_modifier.find_module(module_source, tmp_path)
+
+    # Assert
+    assert result is None
+
+
 def test_add_variable_adds_variables_to_existing_module(
     terraform_modifier: RegexTerraformModifier,
 ):
@@ -347,6 +547,50 @@ def test_add_variable_raises_error_when_module_not_found(
     assert "Could not find module" in str(excinfo.value)
 
 
+def test_add_variable_does_not_quote_references(
+    terraform_modifier: RegexTerraformModifier,
+):
+    """Test that add_variable leaves Terraform references unquoted."""
+    terraform_config = """
+    module "example" {
+      source = "https://github.com/example/module"
+    }
+    """
+
+    result = terraform_modifier.add_variable(
+        terraform_config,
+        "example",
+        {"from_module": "module.metadata.name", "from_each": "each.value"},
+    )
+
+    assert "from_module = module.metadata.name" in result
+    assert "from_each = each.value" in result
+
+
+def test_add_variable_ignores_braces_in_heredocs(
+    terraform_modifier: RegexTerraformModifier,
+):
+    """Test that add_variable appends at the real end of a module containing a heredoc."""
+    # Arrange
+    terraform_config = """
+module "example" {
+  source = "https://github.com/example/module"
+  policy = <<EOF
+}
+EOF
+}
+"""
+
+    # Act
+    result = terraform_modifier.add_variable(
+        terraform_config, "example", {"new_var": "value"}
+    )
+
+    # Assert
+    assert result.index("EOF\n}") < result.index("new_var")
+    assert result.endswith('new_var = "value"\n}\n')
+
+
 def test_add_test_listener_to_ecs_module(terraform_modifier: RegexTerraformModifier):
     """Test that add_test_listener_to_ecs_module adds the test_listener_arn to the lb_listeners array."""
     # Arrange
@@ -411,6 +655,72 @@ def test_find_providers_finds_the_correct_folder_with_providers(
     assert result["file"] == tf_file
 
 
+def test_find_provider_picks_up_changes_to_a_file_read_before(
+    terraform_modifier: RegexTerraformModifier,
+    tmp_path: Path,
+) -> None:
+    """Test that find_provider sees a same-size rewrite that keeps the mtime."""
+    # Arrange
+    terraform_config = """
+    terraform {
+      required_providers {
+        aws = {
+          source  = "hashicorp/aws"
+          version = "~> 4.0.0"
+        }
+      }
+    }
+    """
+    tf_file = tmp_path / "versions.tf"
+    tf_file.write_text(terraform_config)
+    terraform_modifier.find_provider("aws", tmp_path)
+    original_stat = tf_file.stat()
+
+    # Rewrite in place within the same mtime tick, as on a coarse filesystem
+    tf_file.write_text(terraform_config.replace("~> 4.0.0", "~> 6.4.0"))
+    os.utime(tf_file, ns=(original_stat.st_atime_ns, original_stat.st_mtime_ns))
+    assert tf_file.stat().st_size == original_stat.st_size
+
+    # Act
+    result = terraform_modifier.find_provider("aws", tmp_path)
+
+    # Assert
+    assert result is not None
+    assert result["version"] == "~> 6.4.0"
+
+
+def test_find_account_id_reads_the_s3_backend_bucket(
+    terraform_modifier: RegexTerraformModifier,
+    tmp_path: Path,
+) -> None:
+    """Test that find_account_id uses the backend bucket, not other S3 buckets."""
+    # Arrange
+    (tmp_path / "main.tf").write_text(
+        """
+    resource "aws_s3_bucket" "logs" {
+      bucket = "999999999999-logs"
+    }
+    """
+    )
+    (tmp_path / "backend.tf").write_text(
+        """
+    terraform {
+      backend "s3" {
+        bucket = "123456789012-terraform-state"
+        key    = "service/main.tfstate"
+        region = "eu-west-1"
+      }
+    }
+    """
+    )
+
+    # Act
+    result = terraform_modifier.find_account_id(str(tmp_path))
+
+    # Assert
+    assert result == "123456789012"
+
+
 def test_update_provider_versions_replaces_existing_version(
     terraform_modifier: RegexTerraformModifier,
 ) -> None:
@@ -477,6 +787,70 @@ def test_update_provider_versions_with_multiple_providers(
     assert 'version = ">= 6.15.0, < 7.0.0"' in result
 
 
+def test_update_provider_versions_updates_several_providers_at_once(
+    terraform_modifier: RegexTerraformModifier,
+) -> None:
+    """Test that update_provider_versions updates every target provider in one call."""
+    # Arrange
+    terraform_config = """
+    terraform {
+      required_providers {
+        aws = {
+          source  = "hashicorp/aws"
+          version = "~> 5.0.0"
+        }
+        awscc = {
+          source  = "hashicorp/awscc"
+          version = "1.0.0"
+        }
+        vy = {
+          source  = "nsbno/vy"
+          version = "0.3.1"
+        }
+      }
+    }
+    """
+
+    target_providers = {"aws": "~> 6.4.0", "vy": ">= 1.1.0, < 2.0.0"}
+
+    # Act
+    result = terraform_modifier.update_provider_versions(
+        terraform_config, target_providers
+    )
+
+    # Assert
+    assert 'version = "~> 6.4.0"' in result
+    assert 'version = ">= 1.1.0, < 2.0.0"' in result
+    # Providers that only share a prefix with a target are left alone
+    assert 'version = "1.0.0"' in result
+    assert len(result.splitlines()) == len(terraform_config.splitlines())
+
+
+def test_update_provider_versions_adds_required_providers_block_when_missing(
+    terraform_modifier: RegexTerraformModifier,
+) -> None:
+    """Test that update_provider_versions creates a required_providers block if there is none."""
+    # Arrange
+    terraform_config = 'provider "aws" {}\n'
+
+    # Act
+    result = terraform_modifier.update_provider_versions(
+        terraform_config, {"aws": "~> 6.4.0"}
+    )
+
+    # Assert
+    assert result == (
+        "terraform {\n"
+        "  required_providers {\n"
+        "    aws = {\n"
+        '      version = "~> 6.4.0"\n'
+        "    }\n"
+        "  }\n"
+        "}\n"
+        'provider "aws" {}\n'
+    )
+
+
 def test_find_provider_with_multiple_providers(
     terraform_modifier: RegexTerraformModifier, tmp_path: Path
 ) -> None:
@@ -785,6 +1159,43 @@ def test_add_test_listener_preserves_all_content_with_nested_brackets(
     assert result.count("}]") >= 2  # One for conditions, one for lb_listeners
 
 
+def test_add_test_listener_skips_modules_before_the_ecs_module(
+    terraform_modifier: RegexTerraformModifier,
+):
+    """Test that add_test_listener_to_ecs_module only modifies the ECS module."""
+    # Arrange
+    terraform_config = """
+    module "other" {
+      source = "github.com/example/module"
+      tags = {
+        Name = "other"
+      }
+      lb_listeners = [{
+        listener_arn = "other-listener-arn"
+      }]
+    }
+
+    module "service" {
+      source = "github.com/nsbno/terraform-aws-ecs-service?ref=2.0.0"
+
+      lb_listeners = [{
+        listener_arn = "service-listener-arn"
+      }]
+    }
+    """
+
+    # Act
+    result = terraform_modifier.add_test_listener_to_ecs_module(
+        terraform_config, "account_metadata"
+    )
+
+    # Assert
+    assert result.count("test_listener_arn =") == 1
+    other_module, service_module = result.split('module "service"')
+    assert "test_listener_arn" not in other_module
+    assert "test_listener_arn" in service_module
+
+
 def test_add_force_new_deployment_to_ecs_module(
     terraform_modifier: RegexTerraformModifier,
 ):
@@ -813,6 +1224,47 @@ def test_add_force_new_deployment_to_ecs_module(
     assert "lb_listeners = [{" in result  # Ensure existing content is preserved
 
 
+def test_add_force_new_deployment_is_not_fooled_by_comments(
+    terraform_modifier: RegexTerraformModifier,
+):
+    """Test that a comment mentioning force_new_deployment does not count as the attribute."""
+    # Arrange
+    terraform_config = """
+    module "ecs_service" {
+      source = "github.com/nsbno/terraform-aws-ecs-service?ref=3.0.0"
+      # TODO: consider force_new_deployment
+    }
+    """
+
+    # Act
+    result = terraform_modifier.add_force_new_deployment_to_ecs_module(terraform_config)
+
+    # Assert
+    assert "force_new_deployment = true" in result
+
+
+def test_add_force_new_deployment_handles_long_hyphenated_values_quickly(
+    terraform_modifier: RegexTerraformModifier,
+):
+    """Test that tokenizing a long hyphenated run stays linear, not per hyphen."""
+    # Arrange
+    terraform_config = (
+        "module \"ecs_service\" {\n"
+        '  source = "github.com/nsbno/terraform-aws-ecs-service?ref=3.0.0"\n'
+        f"  name = {'a-' * 40_000}a\n"
+        "}\n"
+    )
+
+    # Act
+    started = time.perf_counter()
+    result = terraform_modifier.add_force_new_deployment_to_ecs_module(terraform_config)
+    elapsed = time.perf_counter() - started
+
+    # Assert
+    assert "force_new_deployment = true" in result
+    assert elapsed < 1
+
+
 def test_add_force_new_deployment_raises_error_when_no_ecs_module(
     terraform_modifier: RegexTerraformModifier,
 ):
@@ -966,3 +1418,122 @@ module "service" {
     )
     assert "service_name" in datadog_module
     assert "display_name" in datadog_module
+
+
+def test_get_parameter_finds_values_in_resource_and_data_blocks(
+    terraform_modifier: RegexTerraformModifier, tmp_path: Path
+) -> None:
+    """Test that get_parameter returns values from both resource and data blocks."""
+    # Arrange
+    (tmp_path / "main.tf").write_text(
+        """
+        resource "aws_ecr_repository" "this" {
+          name = "my-app"
+        }
+
+        module "unrelated" {
+          source = "github.com/example/module"
+        }
+        """
+    )
+    (tmp_path / "data.tf").write_text(
+        """
+        data "aws_ecr_repository" "other" {
+          name = "other-app"
+        }
+        """
+    )
+
+    # Act
+    result = terraform_modifier.get_parameter("aws_ecr_repository", "name", tmp_path)
+
+    # Assert
+    assert sorted(result) == ["my-app", "other-app"]
+
+
+def test_get_parameter_finds_values_after_nested_blocks(
+    terraform_modifier: RegexTerraformModifier, tmp_path: Path
+) -> None:
+    """Test that get_parameter finds top-level values that follow a nested block."""
+    # Arrange
+    (tmp_path / "main.tf").write_text(
+        """
+        resource "aws_ecr_repository" "this" {
+          image_scanning_configuration {
+            scan_on_push = true
+          }
+          name = "my-app"
+        }
+        """
+    )
+
+    # Act
+    result = terraform_modifier.get_parameter("aws_ecr_repository", "name", tmp_path)
+
+    # Assert
+    assert result == ["my-app"]
+
+
+def test_get_parameter_finds_values_after_a_brace_inside_a_string(
+    terraform_modifier: RegexTerraformModifier, tmp_path: Path
+) -> None:
+    """Test that get_parameter is not thrown off by braces inside string values."""
+    # Arrange
+    (tmp_path / "main.tf").write_text(
+        """
+        resource "aws_ecr_repository" "this" {
+          description = "images for {service"
+          name        = "my-app"
+        }
+        """
+    )
+
+    # Act
+    result = terraform_modifier.get_parameter("aws_ecr_repository", "name", tmp_path)
+
+    # Assert
+    assert result == ["my-app"]
+
+
+def test_get_parameter_raises_error_when_parameter_not_found(
+    terraform_modifier: RegexTerraformModifier, tmp_path: Path
+) -> None:
+    """Test that get_parameter raises NotFoundError when nothing matches."""
+    # Arrange
+    (tmp_path / "main.tf").write_text(
+        """
+        module "unrelated" {
+          source = "github.com/example/module"
+        }
+        """
+    )
+
+    # Act & Assert
+    with pytest.raises(NotFoundError):
+        terraform_modifier.get_parameter("aws_ecr_repository", "name", tmp_path)
+
+
+def test_has_module_skips_files_above_the_size_limit(
+    terraform_modifier: RegexTerraformModifier, tmp_path: Path, monkeypatch
+) -> None:
+    """Test that has_module does not read files larger than the scan limit."""
+    # Arrange
+    (tmp_path / "empty.tf").write_text("")
+    (tmp_path / "main.tf").write_text(
+        """
+        module "example" {
+          source = "https://github.com/example/module"
+        }
+        """
+    )
+    monkeypatch.setattr(
+        "deployment_migration.infrastructure.terraform_modifier._MAX_TF_FILE_SIZE", 10
+    )
+
+    # Act
+    result = terraform_modifier.has_module(
+        "https://github.com/example/module", tmp_path
+    )
+
+    # Assert
+    assert result is False
@@ -138,3 +138,16 @@ class TestGetOrigin:
             capture_output=True,
             text=True,
         )
+
+    def test_get_origin_only_asks_git_once(self, version_control, mock_subprocess_run):
+        """Test that get_origin reuses the origin URL for the same repository."""
+        # Arrange
+        mock_subprocess_run.return_value.stdout = "git@github.com:user/repo.git\n"
+
+        # Act
+        first = version_control.get_origin()
+        second = version_control.get_origin()
+
+        # Assert
+        assert first == second == "github.com/user/repo"
+        assert mock_subprocess_run.call_count == 1